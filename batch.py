@@ -0,0 +1,86 @@
+"""Headless batch run, for machines without a display:
+
+    python3 batch.py DATASET [--workers N] [--template PATH ...] [--time SECONDS] [--stall SECONDS] [--target-error ERROR]
+                             [--output front.jsonl] [--executable COMMAND] [--param PATH=VALUE ...]
+
+Changes of the Pareto front are written as JSON lines to --output or stdout, the log goes to stderr.
+"""
+from models.main import Model
+from controllers.process import ProcessManager
+from controllers.batch import BatchController
+from utils.parameters import search_options
+from utils.instrumentation import configure_logging, instrumentation
+import argparse
+import shlex
+import signal
+import json
+import sys
+
+def parse_arguments(arguments):
+    metrics = [value for name, _, choices in search_options if name == "search_metric" for _, value in choices]
+    parser = argparse.ArgumentParser(description="Run SRM without the GUI and stream the Pareto front as JSON lines")
+    parser.add_argument('dataset', help="input data file")
+    parser.add_argument('--workers', type=int, default=1, help="number of SRM processes")
+    parser.add_argument('--template', action='append', help="parameters template, may be repeated, all templates by default")
+    parser.add_argument('--metric', choices=metrics, default=None, help="search metric, the template's by default")
+    parser.add_argument('--function-set', default=None, help="e.g. \"+ - * / sin\", the template's by default")
+    parser.add_argument('--terminal-set', default=None, help="the dataset's variables and the template's constants by default")
+    parser.add_argument('--split', type=float, default=1, help="share of the rows used for training, the rest is the test set")
+    parser.add_argument('--test-sample', choices=['random', 'sequential'], default='random')
+    parser.add_argument('--split-seed', type=int, default=None, help="seed of the random test sample, split_seed from config.json by default")
+    parser.add_argument('--param', action='append', default=[], metavar='PATH=VALUE', help="any other parameter, e.g. ECF/Registry/Entry/term.maxgen=500")
+    parser.add_argument('--time', type=float, default=None, help="stop after this many seconds")
+    parser.add_argument('--stall', type=float, default=None, help="stop once the front hasn't gained a function for this many seconds")
+    parser.add_argument('--target-error', type=float, default=None, help="stop once a function reaches this error")
+    parser.add_argument('--output', default=None, help="JSON lines file, stdout by default")
+    parser.add_argument('--executable', default=None, help="SRM command, SRM_path from config.json by default")
+    parser.add_argument('--log-level', default=None, help="log_level from config.json by default")
+    return parser.parse_args(arguments)
+
+def main(arguments=None):
+    args = parse_arguments(arguments)
+    with open('config.json', 'r') as file:
+        config = json.load(file)
+    configure_logging(args.log_level or config.get("log_level", "INFO"), config.get("log_format") == "json")
+    instrumentation.enabled = config.get("instrumentation", True)
+
+    model = Model()
+    model.set_input_path(args.dataset)
+    model.set_thread_count(max(args.workers, 1))
+    model.set_variable("train_test_split", args.split)
+    model.set_variable("test_sample", args.test_sample)
+    if args.split_seed is not None:
+        model.set_variable("split_seed", args.split_seed)
+    if args.metric:
+        model.set_search_metric(args.metric)
+    if args.function_set:
+        model.set_function_set(args.function_set)
+    for param in args.param:
+        path, _, value = param.partition('=')
+        model.set_parameter(path, value)
+
+    executable = shlex.split(args.executable) if args.executable else config["SRM_path"]
+    output = open(args.output, 'w') if args.output else sys.stdout
+    try:
+        controller = BatchController(
+            model, ProcessManager(executable), output,
+            max_seconds=args.time, stall_seconds=args.stall, target_error=args.target_error, stats_path=config.get("stats_report_path")
+        )
+        if args.template:
+            controller.set_templates(args.template)
+        if args.terminal_set:
+            model.set_terminal_set(args.terminal_set)
+        else:
+            controller.set_default_terminal_set()
+
+        # Ctrl+C and kill stop the run the same way as a stop condition, so the final front is still written
+        signal.signal(signal.SIGINT, lambda signum, frame: controller.stop('interrupted'))
+        signal.signal(signal.SIGTERM, lambda signum, frame: controller.stop('terminated'))
+        controller.run()
+    finally:
+        if output is not sys.stdout:
+            output.close()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,121 @@
+"""Stand-in for the SRM executable, for benchmarking on hosts which can't run the bundled binary.
+
+    python -m benchmarks.fake_srm PARAMETERS_FILE [--records N] [--rate N] [--variables N] [--seed N]
+        writes best-file records like an SRM run configured by PARAMETERS_FILE
+    python -m benchmarks.fake_srm serve DATA_FILE ERROR_METRIC [DTYPE]
+        answers individual evaluation calls over the EvaluationServer protocol
+"""
+import re
+import sys
+import time
+import random
+import argparse
+import xml.etree.ElementTree as ET
+
+# Written in format token: (arity, infix format)
+FUNCTIONS = {
+    '+': (2, "({} + {})"),
+    '-': (2, "({} - {})"),
+    '*': (2, "({} * {})"),
+    '/': (2, "({} / {})"),
+    'sin': (1, "sin({})"),
+    'cos': (1, "cos({})"),
+    'log': (1, "log({})"),
+    'sqrt': (1, "sqrt({})"),
+}
+
+class FunctionGenerator:
+    """Generates random expression trees as (infix, prefix, size) with ECF's best-file notation."""
+
+    def __init__(self, num_variables=2, max_depth=6, seed=0):
+        self.num_variables = num_variables
+        self.max_depth = max_depth
+        self.random = random.Random(seed)
+
+    def generate(self):
+        infix, prefix = self.generate_node(0)
+        return infix, ' '.join(prefix), len(prefix)
+
+    def generate_node(self, depth):
+        if depth >= self.max_depth or (depth > 0 and self.random.random() < 0.3):
+            return self.generate_terminal()
+        token = self.random.choice(list(FUNCTIONS))
+        arity, infix_format = FUNCTIONS[token]
+        children = [self.generate_node(depth + 1) for _ in range(arity)]
+        prefix = [token]
+        for _, child_prefix in children:
+            prefix.extend(child_prefix)
+        return infix_format.format(*[child_infix for child_infix, _ in children]), prefix
+
+    def generate_terminal(self):
+        if self.random.random() < 0.8:
+            variable = f"x{self.random.randint(1, self.num_variables)}"
+            return variable, [variable]
+        constant = f"{self.random.uniform(-1, 1):.6f}"
+        return constant, [f"D_{constant}"]
+
+def format_record(generation, infix, prefix, size, error):
+    return (
+        f"{generation}\n"
+        f"{infix}\n"
+        f"<Individual size=\"1\" gen=\"{generation}\">\n"
+        f"\t<FitnessMin value=\"{error}\"/>\n"
+        f"\t<Tree size=\"{size}\">{prefix} </Tree>\n"
+        f"</Individual>\n"
+    )
+
+def write_records(file, generator, num_records, rate=None, seed=0):
+    """Write num_records best-file records, at most rate records per second when rate is given."""
+    rng = random.Random(seed)
+    error = 1000.0
+    start = time.perf_counter()
+    for index in range(num_records):
+        # Like a real run, the best error keeps improving with every generation
+        error *= rng.uniform(0.95, 1.0)
+        infix, prefix, size = generator.generate()
+        file.write(format_record(index + 1, infix, prefix, size, error))
+        if rate:
+            file.flush()
+            delay = (index + 1) / rate - (time.perf_counter() - start)
+            if delay > 0:
+                time.sleep(delay)
+
+def read_parameters(parameters_path):
+    root = ET.parse(parameters_path).getroot()
+    entries = {entry.get('key'): (entry.text or '').strip() for entry in root.iter('Entry')}
+    return entries
+
+def count_variables(input_file, default=2):
+    try:
+        with open(input_file, 'r') as file:
+            return max(len(re.split(r'[\s,]+', file.readline().strip())) - 1, 1)
+    except OSError:
+        return default
+
+def run(arguments):
+    parser = argparse.ArgumentParser(description="Fake SRM writing random best-file records")
+    parser.add_argument('parameters')
+    parser.add_argument('--records', type=int, default=1000)
+    parser.add_argument('--rate', type=float, default=None, help="records per second, unlimited by default")
+    parser.add_argument('--variables', type=int, default=None)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(arguments)
+
+    parameters = read_parameters(args.parameters)
+    # Relative paths are resolved against the working directory, as SRM does
+    best_file_path = parameters.get('bestfile', 'best.txt')
+    num_variables = args.variables or count_variables(parameters.get('input_file', ''))
+
+    generator = FunctionGenerator(num_variables, seed=args.seed)
+    with open(best_file_path, 'w') as file:
+        write_records(file, generator, args.records, args.rate, args.seed)
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1 and sys.argv[1] == 'serve':
+        from models.evaluation_server import serve
+
+        output_stream = sys.stdout.buffer
+        sys.stdout = sys.stderr
+        serve(sys.argv[2], sys.argv[3], sys.stdin.buffer, output_stream, *sys.argv[4:5])
+    else:
+        run(sys.argv[1:])
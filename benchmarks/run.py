@@ -0,0 +1,291 @@
+"""Benchmarks of the ingest, Pareto and evaluation paths, run from the repository root:
+
+    python -m benchmarks.run [--scenario NAME ...] [--rows N] [--records N] [--front N] [--workers N]
+                             [--output results.json] [--baseline results.json]
+
+Results are written as JSON, and compared with a baseline every scenario slower than --threshold is reported.
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import tempfile
+import subprocess
+from types import SimpleNamespace
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from models.main import Model
+from models.evaluation_server import EvaluationServer
+from controllers.main import Controller
+from utils.instrumentation import configure_logging
+from .fake_srm import FunctionGenerator, write_records
+
+def measure(function, repeat):
+    # The fastest of several runs is the least disturbed by the rest of the machine
+    timings = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        timings.append(time.perf_counter() - start)
+    return min(timings), result
+
+def write_input_file(path, rows, variables, seed=0):
+    rng = np.random.default_rng(seed)
+    data = rng.uniform(0.1, 10, size=(rows, variables))
+    target = np.sin(data[:, 0]) * data[:, -1] + rng.normal(scale=0.1, size=rows)
+    np.savetxt(path, np.column_stack([data, target]), delimiter='\t', fmt='%.6f')
+
+def create_model(directory, input_path):
+    model = Model()
+    model.data_loader.cache_directory = os.path.join(directory, 'cache')
+    model.predictions_directory = os.path.join(directory, 'cache', 'predictions')
+    model.train_file_path = os.path.join(directory, 'train.txt')
+    model.test_file_path = os.path.join(directory, 'test.txt')
+    model.set_input_path(input_path)
+    return model
+
+def generate_front(size, variables, seed=0):
+    # Sizes and errors are assigned so every function stays on the front, whatever its tree looks like
+    generator = FunctionGenerator(variables, seed=seed)
+    front = []
+    functions_seen = set()
+    while len(front) < size:
+        infix, prefix, _ = generator.generate()
+        if infix in functions_seen:
+            continue
+        functions_seen.add(infix)
+        front.append({'generation': len(front), 'function': infix, 'prefix_function': prefix, 'size': len(front) + 1, 'error': 1.0 / (len(front) + 1)})
+    return front
+
+def benchmark_parse_best_file(args, directory, input_path):
+    model = create_model(directory, input_path)
+    model.thread_num = args.workers
+    model.register_all_processes()
+    paths = []
+    for id in range(args.workers):
+        path = os.path.join(directory, f"best_{id}.txt")
+        with open(path, 'w') as file:
+            write_records(file, FunctionGenerator(args.variables, seed=id), args.records, seed=id)
+        paths.append(path)
+    num_bytes = sum(os.path.getsize(path) for path in paths)
+
+    def parse():
+        for id in range(args.workers):
+            model.reset_file_reading(id)
+            model.process_states[id]['functions_seen'] = set()
+        # Every worker's file is parsed on its own thread, like the controller's background updates
+        with ThreadPoolExecutor(max_workers=args.workers) as executor:
+            return sum(executor.map(lambda id: len(model.parse_best_file(id, paths[id])), range(args.workers)))
+
+    seconds, records = measure(parse, args.repeat)
+    return {'seconds': seconds, 'records': records, 'bytes': num_bytes, 'records_per_second': records / seconds, 'megabytes_per_second': num_bytes / seconds / 1e6}
+
+def benchmark_filter_best_functions(args, directory, input_path):
+    model = create_model(directory, input_path)
+    generator = FunctionGenerator(args.variables, seed=1)
+    rng = np.random.default_rng(1)
+    candidates = []
+    for index in range(args.records):
+        infix, prefix, size = generator.generate()
+        # Larger functions tend to have lower errors, as in a real run
+        candidates.append({'generation': index, 'function': infix, 'prefix_function': prefix, 'size': size, 'error': float(np.exp(-size / 20) * rng.uniform(1, 1.2))})
+
+    seconds, front = measure(lambda: model.filter_best_functions(candidates), args.repeat)
+    return {'seconds': seconds, 'candidates': len(candidates), 'front_size': len(front), 'candidates_per_second': len(candidates) / seconds}
+
+def benchmark_load_data(args, directory, input_path):
+    model = create_model(directory, input_path)
+
+    def load_cold():
+        shutil.rmtree(model.data_loader.cache_directory, ignore_errors=True)
+        model.data_loader.loaded = {}
+        return model.load_data(input_path)
+
+    def load_warm():
+        # The memory-mapped cache is read, but the text file isn't parsed again
+        model.data_loader.loaded = {}
+        return model.load_data(input_path)
+
+    cold_seconds, data = measure(load_cold, args.repeat)
+    warm_seconds, _ = measure(load_warm, args.repeat)
+
+    def load_text():
+        model.data_loader.loaded = {}
+        return model.load_data(input_path, use_cache=False)
+
+    text_seconds, _ = measure(load_text, args.repeat)
+    return {'cold_seconds': cold_seconds, 'warm_seconds': warm_seconds, 'uncached_seconds': text_seconds, 'rows': int(data.shape[1]), 'bytes': os.path.getsize(input_path)}
+
+def benchmark_split_train_test(args, directory, input_path):
+    model = create_model(directory, input_path)
+    model.train_test_split = 0.7
+    model.test_sample = 'random'
+    model.split_seed = 0
+    model.load_data(input_path)
+
+    def split():
+        # A changed seed forces the split files to be written again
+        model.split_seed += 1
+        model.split_train_test()
+
+    seconds, _ = measure(split, args.repeat)
+    return {'seconds': seconds, 'rows': int(model.input_data.shape[1]), 'rows_per_second': model.input_data.shape[1] / seconds}
+
+def benchmark_calculate_solutions(args, directory, input_path):
+    model = create_model(directory, input_path)
+    model.split_train_test()
+    front = generate_front(args.front, args.variables, seed=2)
+    model.pareto_front.insert_all(front)
+    front = model.pareto_front.to_list()
+    # calculate_solutions only needs the model, so no view is created
+    controller = SimpleNamespace(model=model)
+
+    def calculate(clear):
+        if clear:
+            model.evaluator.subtree_cache.clear()
+        for function in front:
+            Controller.calculate_solutions(controller, function['function'], 'train')
+        return len(front)
+
+    cold_seconds, evaluated = measure(lambda: calculate(True), args.repeat)
+    warm_seconds, _ = measure(lambda: calculate(False), args.repeat)
+    return {'cold_seconds': cold_seconds, 'warm_seconds': warm_seconds, 'functions': evaluated, 'rows': int(model.train_input_data.shape[1]), 'functions_per_second': evaluated / cold_seconds}
+
+def benchmark_test_evaluation(args, directory, input_path):
+    front = generate_front(args.front, args.variables, seed=3)
+    # The fake SRM answers the evaluation calls, as the evaluation server command would
+    server = EvaluationServer(input_path, command=[sys.executable, '-m', 'benchmarks.fake_srm', 'serve'])
+    try:
+        start = time.perf_counter()
+        server.start()
+        server.evaluate(front[0]['prefix_function'])
+        startup_seconds = time.perf_counter() - start
+
+        prefix_functions = [function['prefix_function'] for function in front]
+        batch_seconds, _ = measure(lambda: server.evaluate_batch(prefix_functions), args.repeat)
+        single_seconds, _ = measure(lambda: [server.evaluate_batch([prefix_function]) for prefix_function in prefix_functions], args.repeat)
+    finally:
+        server.stop()
+    return {'startup_seconds': startup_seconds, 'batch_seconds': batch_seconds, 'single_seconds': single_seconds, 'functions': len(front), 'functions_per_second': len(front) / batch_seconds}
+
+# Modules imported at startup, by the GUI, the headless batch run and both of them
+STARTUP_MODULES = ['main', 'batch', 'models.main']
+# Slow imports which the first screen doesn't need
+HEAVY_MODULES = ['matplotlib', 'PIL', 'pandas', 'sklearn']
+STARTUP_CODE = """
+import sys, json, time
+start = time.perf_counter()
+import {module}
+seconds = time.perf_counter() - start
+print(json.dumps({{'seconds': seconds, 'heavy_modules': [name for name in {heavy_modules!r} if name in sys.modules]}}))
+"""
+
+def benchmark_startup(args, directory, input_path):
+    # Every import runs in a fresh interpreter, so nothing is imported already
+    results = {}
+    failed = []
+    for module in STARTUP_MODULES:
+        code = STARTUP_CODE.format(module=module, heavy_modules=HEAVY_MODULES)
+        import_timings = []
+        process_timings = []
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            process = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True)
+            process_timings.append(time.perf_counter() - start)
+            if process.returncode != 0:
+                break
+            output = json.loads(process.stdout.strip().splitlines()[-1])
+            import_timings.append(output['seconds'])
+        if process.returncode != 0:
+            # e.g. the GUI toolkit isn't installed
+            failed.append(module)
+            continue
+        results[f"{module}_import_seconds"] = min(import_timings)
+        results[f"{module}_process_seconds"] = min(process_timings)
+        results[f"{module}_heavy_modules"] = output['heavy_modules']
+    results['failed'] = failed
+    return results
+
+SCENARIOS = {
+    'parse_best_file': benchmark_parse_best_file,
+    'filter_best_functions': benchmark_filter_best_functions,
+    'load_data': benchmark_load_data,
+    'split_train_test': benchmark_split_train_test,
+    'calculate_solutions': benchmark_calculate_solutions,
+    'test_evaluation': benchmark_test_evaluation,
+    'startup': benchmark_startup,
+}
+
+def get_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def compare(results, baseline, threshold):
+    """Return (scenario, metric, ratio) of every timing which got slower than threshold times its baseline."""
+    regressions = []
+    for name, metrics in results['scenarios'].items():
+        baseline_metrics = baseline.get('scenarios', {}).get(name, {})
+        for metric, value in metrics.items():
+            previous = baseline_metrics.get(metric)
+            if metric.endswith('seconds') and previous and value / previous > threshold:
+                regressions.append((name, metric, value / previous))
+    return regressions
+
+def main(arguments=None):
+    parser = argparse.ArgumentParser(description="ECFpyDesk benchmarks")
+    parser.add_argument('--scenario', action='append', choices=list(SCENARIOS), help="may be repeated, all scenarios by default")
+    parser.add_argument('--rows', type=int, default=100000)
+    parser.add_argument('--variables', type=int, default=2)
+    parser.add_argument('--records', type=int, default=20000, help="best-file records per worker and candidates for the Pareto filter")
+    parser.add_argument('--front', type=int, default=200)
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--output', default=None, help="JSON file for the results, printed to stdout by default")
+    parser.add_argument('--baseline', default=None, help="JSON results of an earlier run to compare with")
+    parser.add_argument('--threshold', type=float, default=1.2)
+    args = parser.parse_args(arguments)
+
+    configure_logging('WARNING')
+    results = {
+        'commit': get_commit(),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'platform': platform.platform(),
+        'parameters': {key: getattr(args, key) for key in ('rows', 'variables', 'records', 'front', 'workers', 'repeat')},
+        'scenarios': {},
+    }
+
+    directory = tempfile.mkdtemp(prefix='ecfpydesk-benchmark-')
+    try:
+        input_path = os.path.join(directory, 'input.txt')
+        write_input_file(input_path, args.rows, args.variables)
+        for name in args.scenario or list(SCENARIOS):
+            scenario_directory = os.path.join(directory, name)
+            os.makedirs(scenario_directory)
+            results['scenarios'][name] = SCENARIOS[name](args, scenario_directory, input_path)
+            print(f"{name}: {json.dumps(results['scenarios'][name])}", file=sys.stderr)
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump(results, file, indent=4)
+    else:
+        print(json.dumps(results, indent=4))
+
+    if args.baseline:
+        with open(args.baseline, 'r') as file:
+            regressions = compare(results, json.load(file), args.threshold)
+        for name, metric, ratio in regressions:
+            print(f"Regression in {name}.{metric}: {ratio:.2f}x the baseline", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
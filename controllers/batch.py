@@ -0,0 +1,126 @@
+import json
+import time
+import threading
+from concurrent.futures import wait
+from utils.instrumentation import get_logger
+from .run import RunController
+
+logger = get_logger('batch')
+
+class BatchController(RunController):
+    """Runs SRM without a window, streaming the changes of the Pareto front as JSON lines until a stop condition is met."""
+    POLL_INTERVAL = 0.5
+    FINISH_TIMEOUT = 30
+
+    def __init__(self, model, process_manager, output, max_seconds=None, stall_seconds=None, target_error=None, stats_path=None):
+        super().__init__(model, process_manager)
+        self.output = output
+        self.max_seconds = max_seconds
+        self.stall_seconds = stall_seconds
+        self.target_error = target_error
+        self.stats_path = stats_path
+
+        self.output_lock = threading.Lock()
+        self.stop_event = threading.Event()
+        self.stop_reason = None
+        self.started = time.perf_counter()
+        self.last_improvement = self.started
+        self.best_error = None
+        self.model.register_callback('best_functions_changed', self.handle_best_functions_changed)
+
+    def set_templates(self, template_paths):
+        # Equal starting weights, the scheduler then moves workers towards whichever template yields the most
+        self.config_manager.default_parameters_paths = [(path, 1 / len(template_paths)) for path in template_paths]
+
+    def set_default_terminal_set(self):
+        """Use a variable for every input column, together with the template's other terminals."""
+        data = self.model.load_input_data()
+        if data is None:
+            raise ValueError(f"Could not load the input data from {self.model.get_input_path()}")
+        terminal_set = self.model.get_current_terminal_set() or ""
+        variables = [f"x{i + 1}" for i in range(len(data) - 1)]
+        terminals = [terminal for terminal in terminal_set.split(" ") if terminal and "x" not in terminal]
+        self.model.set_terminal_set(" ".join(variables + terminals))
+
+    def get_process_parameters(self):
+        # Parameters go straight into every process's own file, the shared templates are never written
+        return self.model.params
+
+    def run(self):
+        """Run until a stop condition is met or stop is called, return the reason for stopping."""
+        self.started = time.perf_counter()
+        self.last_improvement = self.started
+        self.write_events([('start', {
+            'dataset': self.model.get_input_path(),
+            'workers': self.model.thread_num,
+            'templates': [path for path, _ in self.config_manager.default_parameters_paths],
+        })])
+        try:
+            is_test = self.prepare_processes()
+            logger.info("Starting batch run", workers=self.model.thread_num, test=is_test)
+            self.start_processes()
+            while not self.stop_event.wait(self.POLL_INTERVAL):
+                self.check_stop_conditions()
+        finally:
+            self.finish()
+        return self.stop_reason
+
+    def check_stop_conditions(self):
+        now = time.perf_counter()
+        if self.max_seconds is not None and now - self.started >= self.max_seconds:
+            self.stop('time_limit')
+        elif self.stall_seconds is not None and now - self.last_improvement >= self.stall_seconds:
+            self.stop('stalled')
+        elif self.target_error is not None and self.best_error is not None and self.best_error <= self.target_error:
+            self.stop('target_error')
+
+    def stop(self, reason):
+        # Safe to call from signal handlers and other threads, the first reason given is kept
+        if self.stop_reason is None:
+            self.stop_reason = reason
+        self.stop_event.set()
+
+    def finish(self):
+        self.process_manager.stop_all_processes()
+        # Records written before the processes were stopped still make it into the front
+        for id in range(self.model.thread_num):
+            if id in self.model.process_states:
+                self.update_solutions(id)
+        wait(list(self.process_threads.values()), timeout=self.FINISH_TIMEOUT)
+        if self.model.is_test():
+            self.model.wait_for_test_evaluation(self.FINISH_TIMEOUT)
+        self.model.stop_evaluation_servers()
+
+        summary = {'reason': self.stop_reason, 'front': [self.format_function(function) for function in self.model.get_best_functions()]}
+        if self.model.scheduler is not None:
+            summary['templates'] = self.model.scheduler.report()
+        self.write_events([('stop', summary)])
+        logger.info("Stopped batch run", reason=self.stop_reason, front_size=len(self.model.get_best_functions()))
+        self.export_stats(self.stats_path)
+
+    def handle_best_functions_changed(self, changes):
+        # Called on background threads, in the order the changes were made
+        events = []
+        for change in changes:
+            if change[0] == 'clear':
+                events.append(('clear', {}))
+            elif change[0] == 'remove':
+                events.append(('remove', {'index': change[1], 'id': change[2]}))
+            else:
+                operation, index, id, function = change
+                events.append((operation, {'index': index, 'id': id, **self.format_function(function)}))
+                if operation == 'insert':
+                    self.last_improvement = time.perf_counter()
+                if self.best_error is None or function['error'] < self.best_error:
+                    self.best_error = function['error']
+        self.write_events(events)
+
+    def format_function(self, function):
+        return {key: function.get(key) for key in ('generation', 'size', 'error', 'function', 'prefix_function')}
+
+    def write_events(self, events):
+        elapsed = round(time.perf_counter() - self.started, 3)
+        with self.output_lock:
+            for event, fields in events:
+                self.output.write(json.dumps({'event': event, 'elapsed': elapsed, **fields}, default=str) + '\n')
+            self.output.flush()
@@ -1,8 +1,11 @@
 import multiprocessing
 from tkinter import filedialog, END
 from utils.parameters import options, search_options
+from utils.instrumentation import get_logger
 from .base import BaseController
 
+logger = get_logger('input')
+
 class InputController(BaseController):
     def __init__(self, model, controller, view):
         super().__init__(model, controller, view, view.frames["input"])
@@ -38,11 +41,11 @@ class InputController(BaseController):
         for func, checkbox in self.frame.checkbox_vars.items():
             checkbox.select() if func in function_set else checkbox.deselect()
 
+        current_values = self.model.config_manager.get_current_param_values(list(self.frame.params_vars))
         for path, var in self.frame.params_vars.items():
-            current_value = self.model.config_manager.get_current_param_value(path)
+            current_value = current_values[path]
             var.set(current_value if current_value is not None else "")
 
-        self.model.get_current_variable("linear_scaling")
         self.frame.linear_scaling_checkbox.select() if self.model.get_current_variable("linear_scaling") == "true" else self.frame.linear_scaling_checkbox.deselect()
 
     def handle_browse_file(self, button_type):
@@ -62,7 +65,7 @@ class InputController(BaseController):
         curr_terminal_set = self.model.get_current_terminal_set()
         terminal_set_without_vars = self.get_terminal_set_without_variables(curr_terminal_set)
         data = self.model.load_input_data()
-        print("Variable number: ", len(data)-1)
+        logger.debug("Loaded input data", variables=len(data)-1)
         var_num = len(data)-1
         self.frame.clear_terminal_scroll_frame()
         self.frame.populate_terminal_scroll_frame(var_num, curr_terminal_set, terminal_set_without_vars)
@@ -72,7 +75,7 @@ class InputController(BaseController):
 
     def on_apply_button_click(self):
         if not self.frame.edit_mode:
-            print("Applying configurations")
+            logger.info("Applying configurations")
             self.controller.apply_configurations()
         else:
             if hasattr(self.frame, 'config_editor'):
@@ -1,26 +1,40 @@
-import subprocess
+import asyncio
 import signal
-import time
 import threading
+from concurrent.futures import ThreadPoolExecutor
 from utils.publisher import Publisher
+from utils.watcher import create_file_watcher
+from utils.instrumentation import get_logger, instrumentation
+
+logger = get_logger('process')
 
 class ProcessManager(Publisher):
     REFRESH_RATE = 1
+    RESTART_DELAY = 0.2
+    STOP_TIMEOUT = 5
+    SCHEDULE_INTERVAL = 30
 
     def __init__(self, executable_path):
         super().__init__()
+        # Either the path of the SRM executable or a command given as a list, e.g. an interpreter followed by a script
         self.executable_path = executable_path
         self.processes = {}
         self.parameters_paths = []
-        self.test_processes = {}
-        self.test_parameters_paths = []
-        self.evaluation_processes = {}
-        self.evaluation_processes_paths = []
-        self.process_threads = {}
+        self.best_file_paths = []
+        self.process_tasks = {}
+        self.ready_events = {}
         self.running = {}
         self.global_running = False
-        self.update_timers = {}
         self.thread_num = 1
+        # Chooses the parameters file of every run when set, otherwise a worker always restarts with the same file
+        self.scheduler = None
+        self.schedule_task = None
+
+        # A single event loop supervises all SRM processes and timers, blocking work goes to a fixed size pool
+        self.loop = None
+        self.loop_thread = None
+        self.file_watcher = None
+        self.executor = ThreadPoolExecutor(thread_name_prefix="ecf-background")
 
     def set_thread_num(self, thread_num):
         self.thread_num = thread_num
@@ -28,93 +42,167 @@ class ProcessManager(Publisher):
     def set_parameters_paths(self, parameters_paths):
         self.parameters_paths = parameters_paths
 
-    def set_test_parameters_paths(self, parameters_paths):
-        self.test_parameters_paths = parameters_paths
+    def set_best_file_paths(self, best_file_paths):
+        self.best_file_paths = best_file_paths
+
+    def set_scheduler(self, scheduler):
+        self.scheduler = scheduler
 
     def reset_running_flags(self):
         self.running = {i: False for i in range(self.thread_num)}
 
+    def start_event_loop(self):
+        if self.loop is None:
+            self.loop = asyncio.new_event_loop()
+            self.loop_thread = threading.Thread(target=self.loop.run_forever, name="ecf-supervisor", daemon=True)
+            self.loop_thread.start()
+            self.call_soon(self.create_file_watcher)
+        return self.loop
+
+    def create_file_watcher(self):
+        self.file_watcher = create_file_watcher(self.loop, self.REFRESH_RATE)
+
+    def watch_best_file(self, id):
+        if id < len(self.best_file_paths):
+            self.call_soon(self.add_file_watch, id, self.best_file_paths[id])
+
+    def add_file_watch(self, id, path):
+        self.file_watcher.watch(path, lambda path: self.invoke_callback('best_file_changed', id))
+
+    def unwatch_best_file(self, id):
+        if id < len(self.best_file_paths):
+            self.call_soon(self.remove_file_watch, self.best_file_paths[id])
+
+    def remove_file_watch(self, path):
+        if self.file_watcher is not None:
+            self.file_watcher.unwatch(path)
+
+    def call_soon(self, callback, *args):
+        self.start_event_loop().call_soon_threadsafe(callback, *args)
+
+    def call_later(self, delay, callback, *args):
+        # Returns a future which can be cancelled from any thread
+        return asyncio.run_coroutine_threadsafe(self.delayed_call(delay, callback, *args), self.start_event_loop())
+
+    async def delayed_call(self, delay, callback, *args):
+        await asyncio.sleep(delay)
+        callback(*args)
+
+    def run_in_background(self, callback, *args):
+        future = self.executor.submit(callback, *args)
+        future.add_done_callback(self.report_background_error)
+        return future
+
+    def report_background_error(self, future):
+        if not future.cancelled() and future.exception() is not None:
+            logger.error("Error in background task", error=str(future.exception()))
+
+    def set_running(self, id):
+        self.running[id] = True
+        self.call_soon(self.notify_ready, id)
+
+    def notify_ready(self, id):
+        if id in self.ready_events:
+            self.ready_events[id].set()
+
     def start_all_processes(self):
         self.global_running = True
         for i, params_path in enumerate(self.parameters_paths):
             self.start_process(i, params_path)
+        if self.scheduler is not None:
+            self.call_soon(self.create_schedule_task)
+
+    def create_schedule_task(self):
+        if self.schedule_task is None:
+            self.schedule_task = self.loop.create_task(self.rebalance_processes())
+
+    async def rebalance_processes(self):
+        # Workers stuck on a stalled template are stopped early, their next run is assigned by the scheduler like any other
+        while True:
+            await asyncio.sleep(self.SCHEDULE_INTERVAL)
+            scheduler = self.scheduler
+            if scheduler is None or not self.global_running:
+                continue
+            for id, process in list(self.processes.items()):
+                if process.returncode is None and scheduler.should_preempt(id):
+                    logger.info("Preempting stalled run", id=id, template=scheduler.get_template(id))
+                    instrumentation.count('scheduler.preempted')
+                    process.terminate()
 
     def start_process(self, id, params_path):
-        print(f"Starting process with id: {id}")
+        logger.debug("Start requested", id=id)
         if id not in self.running or not self.running[id]:
-            print(f"Starting process {id}")
+            logger.info("Starting process", id=id)
             self.running[id] = True
-            self.process_threads[id] = threading.Thread(target=self.run_process_loop, args=(id, params_path))
-            self.process_threads[id].start()
-            print(f"Native ID: {self.process_threads[id].native_id}.")
-            self.start_update_timer(id)
+            self.call_soon(self.create_supervisor, id, params_path)
+            self.watch_best_file(id)
+
+    def create_supervisor(self, id, params_path):
+        self.process_tasks[id] = self.loop.create_task(self.supervise_process(id, params_path))
 
-    def run_process_loop(self, id, params_path):
-        print(f"Running process loop with id: {id}")
+    async def supervise_process(self, id, params_path):
+        logger.debug("Supervising process", id=id)
         while self.global_running:
-            while not self.running[id]:
-                print(f"Process {id} paused, waiting...")
-                time.sleep(0.2)
+            await self.wait_until_ready(id)
+            if self.scheduler is not None:
+                params_path = self.scheduler.start_job(id)
             self.invoke_callback('pre_process_start', id)
-            self.run_train_process(self.executable_path, params_path, id)
+            try:
+                await self.run_train_process(self.executable_path, params_path, id)
+            finally:
+                if self.scheduler is not None:
+                    self.scheduler.finish_job(id)
             if not self.global_running:
                 break
-            time.sleep(0.2)
+            await asyncio.sleep(self.RESTART_DELAY)
 
-    def run_train_process(self, executable_path, parameters_path, id):
-        # Run the executable with subprocess
+    async def wait_until_ready(self, id):
+        # The process is restarted only once the results of its previous run have been processed
+        event = self.ready_events.setdefault(id, asyncio.Event())
+        while not self.running.get(id):
+            logger.debug("Process paused, waiting", id=id)
+            event.clear()
+            await event.wait()
+
+    async def run_train_process(self, executable_path, parameters_path, id):
+        # Run the executable as an asyncio subprocess
         self.running[id] = True
 
         try:
-            self.processes[id] = self.run_process(executable_path, parameters_path)
-            while id in self.processes and self.processes[id].poll() is None:
-                output = self.processes[id].stdout.readline()
+            with instrumentation.span('process.spawn'):
+                self.processes[id] = await asyncio.create_subprocess_exec(
+                    *self.get_command(executable_path),
+                    parameters_path,
+                    stdout=asyncio.subprocess.PIPE,
+                    stderr=asyncio.subprocess.STDOUT
+                )
+            instrumentation.count('process.started')
+            async for output in self.processes[id].stdout:
+                pass
+            await self.processes[id].wait()
+        except asyncio.CancelledError:
+            raise
         except Exception as e:
-            print(f"Error running train ECF process: {e}")    
+            logger.error("Error running train ECF process", id=id, error=str(e))
         finally:
-            print(f"Cleaning up process {id}")
+            logger.debug("Cleaning up process", id=id)
             self.running[id] = False
-            if id in self.processes and self.processes[id]:
+            process = self.processes.pop(id, None)
+            if process is not None and process.returncode is None:
                 # Cleanup the process if it hasn't exited yet
-                self.processes[id].terminate()
-                self.processes[id].wait()
-                del self.processes[id]
-
-            # Cancel the update timer safely
-            if id in self.update_timers:
-                self.update_timers[id].cancel()
-            self.invoke_callback('timer_finished', id)
-                
-
-    def run_test_process(self, id, executable_path=None, parameters_path=None, individual_path=None):
-        if executable_path is None:
-            executable_path = self.executable_path
-        if parameters_path is None:
-            parameters_path = self.test_parameters_paths[id]
-        if individual_path is None:
-            print(f"Error running ECF test process {id}: No individual path provided")
+                process.kill()
+                await process.wait()
 
-        try:
-            self.test_processes[id] = self.run_process(self.executable_path, parameters_path, individual_path)
-            while self.test_processes[id].poll() is None:
-                pass
-        except Exception as e:
-            print(f"Error running ECF test process {id}: {e}")
-        finally:
-            self.cleanup_process(id, is_test=True)
+            # Pick up whatever the process wrote before exiting
+            self.invoke_callback('process_finished', id)
 
-    def run_process(self, *args):
-        try:
-            return subprocess.Popen(
-                [*args],
-                stdout=subprocess.PIPE,
-                stderr=subprocess.STDOUT,
-                text=True,
-                bufsize=1
-            )
-        except Exception as e:
-            print(f"Error running ECF process: {e}")
-            raise e
+    def get_command(self, executable_path):
+        return list(executable_path) if isinstance(executable_path, (list, tuple)) else [executable_path]
+
+    def send_signal(self, id, signal_number):
+        process = self.processes.get(id)
+        if process is not None and process.returncode is None:
+            process.send_signal(signal_number)
 
     def pause_all_processes(self):
         if self.global_running:
@@ -125,10 +213,9 @@ class ProcessManager(Publisher):
     def pause_process(self, id):
         if self.running.get(id):
             self.running[id] = False
-        if id in self.processes and self.processes[id]:
-            self.processes[id].send_signal(signal.SIGSTOP)
-        if id in self.update_timers:
-            self.update_timers[id].cancel()
+        if self.scheduler is not None:
+            self.scheduler.pause_job(id)
+        self.call_soon(self.send_signal, id, signal.SIGSTOP)
 
     def continue_all_processes(self):
         if not self.global_running:
@@ -138,67 +225,46 @@ class ProcessManager(Publisher):
 
     def continue_process(self, id):
         if not self.running.get(id):
-            self.running[id] = True
-        if self.processes[id]:
-            self.processes[id].send_signal(signal.SIGCONT)
-        self.start_update_timer(id)
+            self.set_running(id)
+        if self.scheduler is not None and id in self.processes:
+            self.scheduler.resume_job(id)
+        self.call_soon(self.send_signal, id, signal.SIGCONT)
 
     def stop_all_processes(self):
         if self.global_running:
             self.global_running = False
-        print(f"Thread num: {self.thread_num}")
+        if self.schedule_task is not None:
+            self.loop.call_soon_threadsafe(self.schedule_task.cancel)
+            self.schedule_task = None
+        logger.debug("Stopping all processes", thread_num=self.thread_num)
         for id in range(self.thread_num):
             self.stop_process(id)
 
     def stop_process(self, id):
-        self.cleanup_process(id, is_test=True)
-        self.cleanup_process(id, is_test=False)
-        if id in self.process_threads and self.process_threads[id].is_alive():
-            self.process_threads[id].join()
-            del self.process_threads[id]
-
-    def cleanup_process(self, id, is_test=False):
-        if is_test:
-            self.cleanup_test_process(id)
-        else:
-            self.cleanup_train_process(id)
-
-    def cleanup_train_process(self, id):
-        print(f"Cleaning process {id}")
-        if id in self.processes and self.processes.get(id):
+        logger.debug("Cleaning process", id=id)
+        if self.loop is not None:
+            future = asyncio.run_coroutine_threadsafe(self.stop_supervisor(id), self.loop)
             try:
-                self.processes[id].terminate()
-                self.processes[id].wait(timeout=0.5)
-            except subprocess.TimeoutExpired:
-                self.processes[id].kill()
-            finally:
-                if id in self.processes:
-                    del self.processes[id]
-        if self.update_timers.get(id):
-            self.update_timers[id].cancel()
-            del self.update_timers[id]
+                future.result(timeout=self.STOP_TIMEOUT)
+            except Exception as e:
+                logger.error("Error stopping process", id=id, error=str(e))
+            self.unwatch_best_file(id)
         if id in self.running:
-            print(f"Cleaning running flag for process {id}")
+            logger.debug("Cleaning running flag", id=id)
             del self.running[id]
 
-    def cleanup_test_process(self, id):
-        print(f"Cleaning test process {id}")
-        if id in self.test_processes:
+    async def stop_supervisor(self, id):
+        task = self.process_tasks.pop(id, None)
+        process = self.processes.get(id)
+        if process is not None and process.returncode is None:
+            process.terminate()
+            # A paused process only handles the termination signal once it is continued
+            process.send_signal(signal.SIGCONT)
             try:
-                self.test_processes[id].terminate()
-                self.test_processes[id].wait(timeout=0.5)
-            except subprocess.TimeoutExpired:
-                self.test_processes[id].kill()
-            finally:
-                if id in self.test_processes:
-                    del self.test_processes[id]
-
-    def start_update_timer(self, id):
-        if not self.running.get(id) and not self.global_running:
-            return
-        if id not in self.update_timers:
-            self.update_timers[id] = threading.Timer(self.REFRESH_RATE, lambda: self.invoke_callback('timer_finished', id))
-            self.update_timers[id].start()
-        elif not self.update_timers[id].is_alive():
-            self.update_timers[id] = threading.Timer(self.REFRESH_RATE, lambda: self.invoke_callback('timer_finished', id))
-            self.update_timers[id].start()
\ No newline at end of file
+                await asyncio.wait_for(process.wait(), timeout=0.5)
+            except asyncio.TimeoutError:
+                process.kill()
+                await process.wait()
+        if task is not None:
+            task.cancel()
+        self.ready_events.pop(id, None)
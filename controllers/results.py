@@ -1,6 +1,9 @@
 from utils.parameters import plot_options
+from utils.instrumentation import get_logger, instrumentation
 from .base import BaseController
 
+logger = get_logger('results')
+
 class ResultsController(BaseController):
     def __init__(self, model, controller, view):
         super().__init__(model, controller, view, view.frames["results"])
@@ -20,7 +23,7 @@ class ResultsController(BaseController):
     def move_selection(self, direction):
         if direction == "up" and self.frame.current_active_row > 0:
             self.select_row(self.frame.current_active_row - 1)
-        elif direction == "down" and self.frame.current_active_row < len(self.frame.solutions_list_frame.winfo_children()) // 3 - 1:
+        elif direction == "down" and self.frame.current_active_row < self.frame.get_row_count() - 1:
             self.select_row(self.frame.current_active_row + 1)
 
     def select_row(self, row):
@@ -30,8 +33,11 @@ class ResultsController(BaseController):
 
     def select_active_row(self):
         row = self.frame.current_active_row
-        function = self.model.best_functions[row]["function"]
-        error = self.model.best_functions[row]["error"]
+        if row is None:
+            return
+        func = self.frame.get_solution(row)
+        function = func["function"]
+        error = func["error"]
         
         self.frame.update_info(function, error)
         self.update_plot(function)
@@ -43,48 +49,70 @@ class ResultsController(BaseController):
         if data_type is None:
             data_type = self.model.get_data_type()
 
-        x_data, y_data = self.model.get_plot_data(data_type)
+        if self.model.get_data(data_type) is None:
+            return
+
         plot_scale = self.model.plot_scale
         plot_y_index = self.model.plot_y_index
         plot_type = self.model.plot_type
-        
-        if x_data is None or y_data is None:
-            return
-
         multivar = self.model.is_multivar()
 
         try:
+            function_results = None
             if function:
-                x_values, function_results = self.controller.evaluate_function(function, multivar, data_type=data_type)
-                self.frame.update_plot(x_data, y_data, x_values, function_results, multivar, plot_scale=plot_scale, plot_y_index=plot_y_index, plot_type=plot_type)
-            else:
-                self.frame.update_plot(x_data, y_data, plot_scale=plot_scale, plot_y_index=plot_y_index, plot_type=plot_type)
+                with instrumentation.span('plot.evaluate'):
+                    _, function_results = self.controller.evaluate_function(function, multivar, data_type=data_type)
+            # Series are decimated to the width of the plot, so large datasets don't freeze the canvas
+            with instrumentation.span('plot.decimate'):
+                data_series, function_series = self.model.get_plot_series(data_type, function, function_results, pixels=self.frame.get_plot_width())
+            self.frame.update_plot(data_series, function_series, plot_scale=plot_scale, plot_y_index=plot_y_index, plot_type=plot_type)
         except Exception as e:
-            print(f"Error evaluating function '{function}': {e}")
+            logger.error("Error evaluating function", function=function, error=str(e))
             self.view.display_error(f"Error evaluating function '{function}': {e}")
 
-    def update_solutions_frame(self, best_functions):
-        if self.frame.best_functions == best_functions:
+    def apply_best_functions_changes(self, changes):
+        """Apply the change feed of the aggregate front to the solutions list, keeping the selected function selected."""
+        instrumentation.count('refresh.changes', len(changes))
+        active_row = self.frame.current_active_row
+        fallback_row = 0
+        active_changed = False
+
+        for change in changes:
+            if change[0] == 'clear':
+                self.frame.clear_solution_rows()
+                active_row = None
+                fallback_row = 0
+            elif change[0] == 'insert':
+                _, index, _, func = change
+                self.frame.insert_solution_row(func, index)
+                if active_row is not None and active_row >= index:
+                    active_row += 1
+            elif change[0] == 'remove':
+                index = change[1]
+                self.frame.destroy_solution_row(index)
+                if active_row == index:
+                    # The selection moves to the function which took the removed one's place
+                    active_row = None
+                    fallback_row = index
+                elif active_row is not None and active_row > index:
+                    active_row -= 1
+            elif change[0] == 'update':
+                _, index, _, func = change
+                self.frame.update_solution_row(func, index)
+                if active_row == index:
+                    active_changed = True
+
+        row_count = self.frame.get_row_count()
+        if row_count == 0:
+            self.frame.current_active_row = None
             return
+        if active_row is None:
+            active_row = min(fallback_row, row_count - 1)
+            active_changed = True
 
-        for i, func in enumerate(best_functions):
-            if i < len(self.frame.best_functions):
-                if func["function"] != self.frame.best_functions[i]["function"]:
-                    self.frame.update_solution_row(func, i)
-                    if self.frame.current_active_row is not None and self.frame.current_active_row == i:
-                        self.select_row(i)
-            else:
-                self.frame.create_solution_row(func, i)
-                if self.frame.current_active_row is None and i == 0:
-                    self.select_row(i)
-
-        if len(best_functions) < len(self.frame.best_functions):
-            for i in range(len(best_functions), len(self.frame.best_functions)):
-                self.frame.destroy_solution_row(i)
-                if self.frame.current_active_row is not None and self.frame.current_active_row == i:
-                    self.select_row(len(best_functions)-1)
-
-        self.frame.best_functions = best_functions
+        self.frame.current_active_row = active_row
+        if active_changed:
+            self.select_active_row()
 
     def clear_frame(self):
         self.frame.clear_frame()
@@ -99,7 +127,7 @@ class ResultsController(BaseController):
         self.model.set_variable(variable_name, value)
         function = None
         if self.frame.current_active_row is not None:
-            function = self.model.best_functions[self.frame.current_active_row]["function"]
+            function = self.frame.get_solution(self.frame.current_active_row)["function"]
         self.update_plot(function)
 
     
@@ -0,0 +1,132 @@
+import os
+import threading
+from utils.file import create_directory
+from utils.instrumentation import get_logger, instrumentation
+
+logger = get_logger('run')
+
+class RunController:
+    """Starts SRM processes and feeds their best files into the model, shared by the GUI and the headless batch run."""
+
+    def __init__(self, model, process_manager):
+        self.model = model
+        self.process_manager = process_manager
+        self.config_manager = model.config_manager
+        self.process_threads = {}
+        self.pending_updates = set()
+        # Processes with an update in flight, checked and changed together with pending_updates under update_lock
+        self.updating = set()
+        self.update_lock = threading.Lock()
+        self.register_run_callbacks()
+
+    def register_run_callbacks(self):
+        self.process_manager.register_callback('pre_process_start', self.pre_process_setup)
+        self.process_manager.register_callback('best_file_changed', self.handle_best_file_changed)
+        self.process_manager.register_callback('process_finished', self.handle_process_finished)
+
+    def handle_best_file_changed(self, id):
+        self.update_solutions(id)
+
+    def handle_process_finished(self, id):
+        logger.info("Process finished", id=id)
+        self.update_solutions(id)
+
+    def pre_process_setup(self, id):
+        logger.info("Starting process", id=id)
+        self.model.reset_file_reading(id)
+
+    def update_solutions(self, id=None):
+        if id is not None:
+            with self.update_lock:
+                if id in self.updating:
+                    # The running update checks pending_updates before it finishes, so it picks up the new data
+                    self.pending_updates.add(id)
+                    return
+                self.updating.add(id)
+            # Run the update for specific process ID on the process manager's background pool
+            self.process_threads[id] = self.process_manager.run_in_background(self.update_best_functions, id)
+            logger.debug("Started update", id=id)
+        else:
+            # Update all processes
+            for id in self.process_manager.processes.keys():
+                self.update_solutions(id)
+
+    def update_best_functions(self, id):
+        try:
+            while True:
+                self.read_best_functions(id)
+                # Update again if new data is present, the in flight flag is only cleared once nothing is pending
+                with self.update_lock:
+                    if id not in self.pending_updates and not self.model.has_new_data(id):
+                        self.updating.discard(id)
+                        break
+                    self.pending_updates.discard(id)
+        except BaseException:
+            with self.update_lock:
+                self.updating.discard(id)
+            raise
+
+        if id in self.process_manager.running:
+            self.process_manager.set_running(id)
+
+    def read_best_functions(self, id):
+        with instrumentation.span('refresh.update'):
+            new_functions = self.model.parse_best_functions(id)
+
+            if self.model.is_test():
+                # Scored in batches on the test data and added to the Pareto front once evaluated
+                self.model.submit_test_functions(id, new_functions)
+            else:
+                self.model.add_best_functions(id, new_functions)
+
+    def prepare_processes(self):
+        """Split the input data and write the parameters file of every process, return whether a test set is split off."""
+        if self.model.input_data is None:
+            self.model.load_input_data()
+        create_directory(os.path.dirname(self.model.train_file_path))
+        self.model.split_train_test()
+        is_test = self.model.is_test()
+
+        scheduler = self.model.create_scheduler()
+        parameters_paths = []
+        best_file_paths = []
+        for id in range(self.model.thread_num):
+            if scheduler is not None:
+                # A config is written for every template up front, the scheduler picks one of them at every start
+                template_paths = {template: self.create_process_config(id, template) for template, _ in self.config_manager.default_parameters_paths}
+                scheduler.set_parameters_paths(id, template_paths)
+                parameters_paths.append(next(iter(template_paths.values())))
+            else:
+                parameters_paths.append(self.create_process_config(id))
+            best_file_paths.append(self.model.get_best_file_path(id))
+
+        if is_test:
+            self.model.start_evaluation_servers()
+
+        self.process_manager.set_thread_num(self.model.thread_num)
+        self.process_manager.set_parameters_paths(parameters_paths)
+        self.process_manager.set_best_file_paths(best_file_paths)
+        self.process_manager.set_scheduler(scheduler)
+        self.model.register_all_processes()
+        self.model.data_type = 'train'
+        return is_test
+
+    def create_process_config(self, id, template_path=None):
+        return self.model.create_process_config(id, is_test=False, delete_logs=False, params=self.get_process_parameters(), template_path=template_path)
+
+    def get_process_parameters(self):
+        # The GUI writes its parameters to the templates when they are applied
+        return None
+
+    def export_stats(self, stats_path):
+        if not stats_path or not instrumentation.enabled:
+            return
+        try:
+            instrumentation.export(stats_path)
+            logger.info("Exported stats report", path=stats_path)
+        except OSError as e:
+            logger.error("Error exporting stats report", path=stats_path, error=str(e))
+
+    def start_processes(self):
+        self.process_manager.reset_running_flags()
+        self.process_manager.start_all_processes()
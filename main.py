@@ -1,10 +1,18 @@
 from models.main import Model
 from views.main import View
 from controllers.main import Controller
+from utils.instrumentation import configure_logging, instrumentation
+import json
 import os
 
 def main():
     app_directory = os.path.dirname(os.path.abspath(__file__))  # Get the directory of main.py
+    with open('config.json', 'r') as file:
+        config = json.load(file)
+    # A log_level of "OFF" switches the log off, "instrumentation": false switches off spans and counters
+    configure_logging(config.get("log_level", "INFO"), config.get("log_format") == "json")
+    instrumentation.enabled = config.get("instrumentation", True)
+
     # Initialize the MVC components
     model = Model()
     view = View()
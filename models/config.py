@@ -1,15 +1,18 @@
 import xml.etree.ElementTree as ET
+import os
 import re
 import math
-import pandas as pd
-import shutil
-from sklearn.model_selection import train_test_split
-from utils.file import delete_file_if_exists
+import copy
+import weakref
 from utils.helper import choose_random_element_with_probability
+from utils.instrumentation import get_logger
+
+logger = get_logger('config')
 
 class ProcessConfiguration:
-    def __init__(self, parameters_path, input_file_path, best_file_path, log_file_path=None, tree=None, root=None):
+    def __init__(self, parameters_path, input_file_path, best_file_path, log_file_path=None, tree=None, root=None, template_path=None):
         self.parameters_path = parameters_path
+        self.template_path = template_path
         self.input_file_path = input_file_path
         self.best_file_path = best_file_path
         self.log_file_path = log_file_path
@@ -17,6 +20,7 @@ class ProcessConfiguration:
         self.root = root
 
 class ConfigurationManager:
+    CURRENT_TEMPLATE = "srm/srmGP.txt"
     tree = None
     root = None
 
@@ -33,20 +37,53 @@ class ConfigurationManager:
         self.eval_configurations = {}
         self.configurations = {}
         self.test_configurations = {}
+        # Parsed templates, written in format path: (modification time, tree)
+        self.template_cache = {}
+        # Elements found for each parameter path, kept separately for every tree
+        self.element_indexes = weakref.WeakKeyDictionary()
+        # Cached template the current tree was copied from
+        self.current_template = None
 
     def set_tree_and_root(self):
-        self.tree, self.root = self.parse_XML("srm/srmGP.txt")
-
-    def create_config(self, process_id, parameters_path, input_file_path, best_file_path, log_file_path, is_test=False):
-        if is_test:
+        # The current tree is a private copy, so changing it never touches the shared cached template
+        template = self.load_template(self.CURRENT_TEMPLATE)
+        if template is not self.current_template:
+            self.current_template = template
+            self.tree = copy.deepcopy(template)
+            self.root = self.tree.getroot()
+
+    def load_template(self, parameters_path):
+        # Cached trees are shared, use copy_template to get a tree which can be changed
+        modification_time = os.stat(parameters_path).st_mtime_ns
+        cached = self.template_cache.get(parameters_path)
+        if cached is None or cached[0] != modification_time:
+            tree, root = self.parse_XML(parameters_path)
+            cached = (modification_time, tree)
+            self.template_cache[parameters_path] = cached
+        return cached[1]
+
+    def copy_template(self, parameters_path):
+        tree = copy.deepcopy(self.load_template(parameters_path))
+        return tree, tree.getroot()
+
+    def cache_template(self, tree, parameters_path):
+        self.template_cache[parameters_path] = (os.stat(parameters_path).st_mtime_ns, tree)
+
+    def create_config(self, process_id, parameters_path, input_file_path, best_file_path, log_file_path, is_test=False, params=None, template_path=None):
+        if template_path is not None:
+            default_parameters_path = template_path
+        elif is_test:
             default_parameters_path = choose_random_element_with_probability(self.default_evaluation_parameters_paths)
         else:
             default_parameters_path = choose_random_element_with_probability(self.default_parameters_paths)
         
-        tree, root = self.parse_XML(default_parameters_path)
+        tree, root = self.copy_template(default_parameters_path)
+        if params:
+            # Parameters given for this process only, the templates themselves are left unchanged
+            self.update_parameters(params, tree)
         self.prepare_config(tree, default_parameters_path)
         
-        process_config = ProcessConfiguration(parameters_path=parameters_path, input_file_path=input_file_path, best_file_path=best_file_path, log_file_path=log_file_path, tree=tree, root=root)
+        process_config = ProcessConfiguration(parameters_path=parameters_path, input_file_path=input_file_path, best_file_path=best_file_path, log_file_path=log_file_path, tree=tree, root=root, template_path=default_parameters_path)
         self.create_parameters_file(process_config, is_test)
 
         if process_id == 'eval':
@@ -79,16 +116,12 @@ class ConfigurationManager:
 
     def update_config(self, params, process_id=None, is_test=False):
         if process_id is None:
-            for (path, probs) in self.default_parameters_paths:
-                tree, root = self.parse_XML(path)
-                self.update_parameters(params, tree)
-                self.prepare_config(tree, path)
-                self.write_config(tree, path)
-            for (path, probs) in self.default_evaluation_parameters_paths:
-                tree, root = self.parse_XML(path)
+            for (path, probs) in self.default_parameters_paths + self.default_evaluation_parameters_paths:
+                tree, root = self.copy_template(path)
                 self.update_parameters(params, tree)
                 self.prepare_config(tree, path)
                 self.write_config(tree, path)
+                self.cache_template(tree, path)
             
         else:
             if process_id == 'eval':
@@ -114,15 +147,18 @@ class ConfigurationManager:
         return self.get_current_param_value("ECF/Genotype/Entry/terminalset")
     
     def get_current_param_value(self, path):
-        # Load the XML tree from a file or an existing in-memory object
-        if self.tree is None:
-            self.set_tree_and_root()
-
-        target_elements = self.find_param_elements(path, self.tree)
-
-        if target_elements != []:
-            return target_elements[0].text  # Return the text content of the element
-        return None  # If the element with the key doesn't exist, return None
+        return self.get_current_param_values([path])[path]
+
+    def get_current_param_values(self, paths):
+        """Return the template's value of every path, None for a missing parameter."""
+        # The template file is only checked for changes once for all the paths
+        self.set_tree_and_root()
+
+        values = {}
+        for path in paths:
+            target_elements = self.find_param_elements(path, self.tree)
+            values[path] = target_elements[0].text if target_elements != [] else None
+        return values
     
     def set_param_element(self, path, value, tree):
         target_elements = self.find_param_elements(path, tree)
@@ -134,11 +170,17 @@ class ConfigurationManager:
             self.add_param_element(path, value, tree)
     
     def find_param_elements(self, path, tree=None):
-        # Split the path by slashes to navigate through the nodes
-        elements = path.split('/')
-
         if tree is None:
             tree = self.tree
+
+        element_index = self.element_indexes.setdefault(tree, {})
+        if path not in element_index:
+            element_index[path] = self.search_param_elements(path, tree)
+        return element_index[path]
+
+    def search_param_elements(self, path, tree):
+        # Split the path by slashes to navigate through the nodes
+        elements = path.split('/')
         root = tree.getroot()
 
         current_element = root
@@ -174,7 +216,7 @@ class ConfigurationManager:
             # Navigate to the parent element
             parent = root.find(parent_path)
             if parent is None:
-                print(f"Could not find the parent path: {parent_path}")
+                logger.warning("Could not find the parent path", path=parent_path)
                 return False
 
             # Check if the element already exists
@@ -186,11 +228,13 @@ class ConfigurationManager:
                 new_element = ET.Element(entry, key=key)
                 new_element.text = str(value)
                 parent.append(new_element)
+                # Searches which found nothing before have to be repeated
+                self.element_indexes.pop(tree, None)
 
             ET.indent(tree, space="\t", level=0)
             return tree
         except Exception as e:
-            print(f"Error when adding parameter: {e}")
+            logger.error("Error when adding parameter", error=str(e))
             return None
         
     def prepare_config(self, tree, parameters_path):
@@ -215,52 +259,3 @@ class ConfigurationManager:
         variables = [element for element in terminal_set if re.match(pattern, element)]
         
         return len(variables)
-
-    def split_train_test(self, input_data_path, train_output_path, test_output_path, train_test_split_ratio=1, test_sample_choice="random"):
-        delete_file_if_exists(train_output_path)
-        delete_file_if_exists(test_output_path) 
-
-        if (train_test_split_ratio == 1):
-            try:
-                shutil.copyfile(input_data_path, train_output_path)
-            except FileNotFoundError:
-                print(f"Source file '{input_data_path}' not found.")
-            except Exception as e:
-                print(f"Error occurred while copying file: {e}")
-            return True
-
-        # Load the data
-        data = pd.read_csv(input_data_path, delimiter='\t')
-
-        # Determine if the data should be shuffled
-        shuffle = test_sample_choice == "random"
-
-        # Split the data
-        train_data, test_data = train_test_split(data, test_size=1-train_test_split_ratio, shuffle=shuffle)
-
-        # Save the data to files
-        train_data.to_csv(train_output_path, sep='\t', index=False)
-        test_data.to_csv(test_output_path, sep='\t', index=False)
-
-        return True
-    
-    def create_individual_file(self, file_path, error, size, prefix_function):
-        file_string = ""
-        file_string += '<Individual size="1">\n'
-        file_string += f'\t<FitnessMin value="{error}"/>\n'
-        file_string += f'\t<Tree size="{size}">{prefix_function} </Tree>\n'
-        file_string += '</Individual>'
-
-        with open(file_path, 'w') as file:
-            file.write(file_string)
-
-    def parse_best_individual_file(self, file_path):
-        with open(file_path, 'r') as file:
-            lines = file.readlines() 
-            error = float(lines[3].split('"')[1])
-            solutions = []
-            for i in range(7, len(lines)):
-                if lines[i].strip() != "":
-                    solutions.append(float(lines[i].strip())) 
-
-        return error, solutions
\ No newline at end of file
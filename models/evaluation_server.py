@@ -0,0 +1,138 @@
+import struct
+import subprocess
+import sys
+import threading
+import numpy as np
+
+# Requests are a count followed by length prefixed UTF-8 prefix functions, each followed by its linear scaling (a, b),
+# every function is answered with (status, error, number of predictions) followed by float64 predictions
+REQUEST_HEADER = struct.Struct('<I')
+COEFFICIENTS = struct.Struct('<dd')
+UNSCALED = (0.0, 1.0)
+RESPONSE_HEADER = struct.Struct('<BdI')
+STATUS_OK = 0
+STATUS_ERROR = 1
+
+def read_exactly(stream, size):
+    data = b''
+    while len(data) < size:
+        chunk = stream.read(size - len(data))
+        if not chunk:
+            raise EOFError("Evaluation stream closed")
+        data += chunk
+    return data
+
+class EvaluationServer:
+    """Client of a long-lived evaluation worker which loads a dataset once and evaluates individuals sent over a pipe."""
+    STOP_TIMEOUT = 1
+
+    def __init__(self, data_path, error_metric='mean_square_error', command=None, cwd=None, dtype='float64'):
+        self.data_path = data_path
+        self.error_metric = error_metric
+        # The worker loads the data in the same precision as the in-process evaluators
+        self.dtype = np.dtype(dtype).name
+        # Any executable speaking the same protocol can be used, by default the Python worker below
+        self.command = command if command is not None else [sys.executable, '-m', 'models.evaluation_server']
+        self.cwd = cwd
+        self.process = None
+        self.lock = threading.Lock()
+
+    def is_running(self):
+        return self.process is not None and self.process.poll() is None
+
+    def start(self):
+        if not self.is_running():
+            self.process = subprocess.Popen(
+                [*self.command, self.data_path, self.error_metric, self.dtype],
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                cwd=self.cwd
+            )
+
+    def evaluate(self, prefix_function):
+        """Return the error and predictions of a prefix function on the worker's dataset."""
+        result = self.evaluate_batch([prefix_function])[0]
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    def evaluate_batch(self, prefix_functions, coefficients=None):
+        """Evaluate several prefix functions in one round trip, failed evaluations are returned as ValueError.
+
+        coefficients may give a fixed linear scaling (a, b) for every function, which is never fit on the worker's own data.
+        """
+        if coefficients is None:
+            coefficients = [None] * len(prefix_functions)
+        request = [REQUEST_HEADER.pack(len(prefix_functions))]
+        for prefix_function, function_coefficients in zip(prefix_functions, coefficients):
+            encoded = prefix_function.encode()
+            request.append(REQUEST_HEADER.pack(len(encoded)) + encoded + COEFFICIENTS.pack(*(function_coefficients or UNSCALED)))
+
+        results = []
+        with self.lock:
+            self.start()
+            self.process.stdin.write(b''.join(request))
+            self.process.stdin.flush()
+
+            for _ in prefix_functions:
+                status, error, count = RESPONSE_HEADER.unpack(read_exactly(self.process.stdout, RESPONSE_HEADER.size))
+                payload = read_exactly(self.process.stdout, count * 8)
+                if status != STATUS_OK:
+                    results.append(ValueError(payload.decode(errors='replace').rstrip()))
+                else:
+                    results.append((error, np.frombuffer(payload, dtype='<f8')))
+
+        return results
+
+    def stop(self):
+        if self.process is None:
+            return
+        try:
+            # Closing the input ends the worker's request loop
+            self.process.stdin.close()
+            self.process.wait(timeout=self.STOP_TIMEOUT)
+        except (OSError, subprocess.TimeoutExpired):
+            self.process.kill()
+        finally:
+            self.process = None
+
+def serve(data_path, error_metric, input_stream, output_stream, dtype='float64'):
+    from .loader import DataLoader
+    from .evaluator import ExpressionEvaluator
+
+    data = DataLoader(dtype=dtype).load(data_path)
+    evaluator = ExpressionEvaluator()
+
+    while True:
+        try:
+            count, = REQUEST_HEADER.unpack(read_exactly(input_stream, REQUEST_HEADER.size))
+            requests = []
+            for _ in range(count):
+                size, = REQUEST_HEADER.unpack(read_exactly(input_stream, REQUEST_HEADER.size))
+                prefix_function = read_exactly(input_stream, size).decode()
+                requests.append((prefix_function, COEFFICIENTS.unpack(read_exactly(input_stream, COEFFICIENTS.size))))
+        except EOFError:
+            return
+
+        # The whole request is read before answering, so a client writing a large batch can't deadlock on full pipes
+        for prefix_function, coefficients in requests:
+            output_stream.write(evaluate_request(evaluator, data, prefix_function, error_metric, coefficients, dataset_key=data_path))
+        output_stream.flush()
+
+def evaluate_request(evaluator, data, prefix_function, error_metric, coefficients=None, dataset_key=None):
+    try:
+        # The worker's dataset never changes, so subtrees shared across the front are cached under one key
+        predictions = evaluator.evaluate(prefix_function, data[:-1], target=data[-1], dataset_key=dataset_key, coefficients=coefficients if coefficients != UNSCALED else None)
+        error = evaluator.calculate_error(predictions, data[-1], error_metric)
+        return RESPONSE_HEADER.pack(STATUS_OK, error, len(predictions)) + predictions.astype('<f8').tobytes()
+    except Exception as e:
+        # Error messages are padded to whole float64 values, so the count in the header is read the same way for both statuses
+        message = str(e).encode()
+        message += b' ' * (-len(message) % 8)
+        return RESPONSE_HEADER.pack(STATUS_ERROR, float('nan'), len(message) // 8) + message
+
+if __name__ == '__main__':
+    output_stream = sys.stdout.buffer
+    # Anything printed while serving must not end up in the response stream
+    sys.stdout = sys.stderr
+    serve(sys.argv[1], sys.argv[2], sys.stdin.buffer, output_stream, *sys.argv[3:4])
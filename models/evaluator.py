@@ -0,0 +1,225 @@
+import re
+import threading
+import numpy as np
+from utils.cache import LRUCache
+
+class ScalingAccumulator:
+    """Fits ECF's linear scaling, target ~ a + b * predictions, from blocks of rows which can be merged in any order."""
+
+    def __init__(self):
+        self.count = 0
+        self.predictions_mean = 0.0
+        self.target_mean = 0.0
+        # Sum of squared deviations of the predictions and co-moment of predictions and target
+        self.predictions_m2 = 0.0
+        self.comoment = 0.0
+
+    def add(self, predictions, target):
+        predictions = np.asarray(predictions, dtype=float)
+        target = np.asarray(target, dtype=float)
+        if len(predictions) == 0:
+            return
+        block = ScalingAccumulator()
+        block.count = len(predictions)
+        block.predictions_mean = float(predictions.mean())
+        block.target_mean = float(target.mean())
+        block.predictions_m2 = float(np.sum((predictions - block.predictions_mean) ** 2))
+        block.comoment = float(np.sum((predictions - block.predictions_mean) * (target - block.target_mean)))
+        self.merge(block)
+
+    def merge(self, other):
+        # Pairwise update of the centered sums, which stays exact for constant predictions
+        if other.count == 0:
+            return
+        count = self.count + other.count
+        weight = self.count * other.count / count
+        predictions_delta = other.predictions_mean - self.predictions_mean
+        target_delta = other.target_mean - self.target_mean
+        self.predictions_m2 += other.predictions_m2 + predictions_delta ** 2 * weight
+        self.comoment += other.comoment + predictions_delta * target_delta * weight
+        self.predictions_mean += predictions_delta * other.count / count
+        self.target_mean += target_delta * other.count / count
+        self.count = count
+
+    def coefficients(self):
+        b = self.comoment / self.predictions_m2 if self.predictions_m2 > 0 else 0.0
+        return self.target_mean - b * self.predictions_mean, b
+
+class ExpressionEvaluator:
+    """Compiles ECF prefix trees (as written to the best file) into vectorized NumPy evaluations."""
+    # ECF protects division by (near) zero and returns 1 instead
+    DIVISION_EPSILON = 0.000001
+    VARIABLE_PATTERN = re.compile(r'^x(\d+)$')
+    SUBTREE_CACHE_BYTES = 128 * 1024 * 1024
+    # The expression DAG is rebuilt from scratch once it holds this many nodes or functions
+    MAX_NODES = 200000
+
+    def __init__(self, subtree_cache_bytes=SUBTREE_CACHE_BYTES):
+        # Every function from options["Functions"], written as (arity, implementation)
+        self.functions = {
+            '+': (2, np.add),
+            '-': (2, np.subtract),
+            '*': (2, np.multiply),
+            '/': (2, self.protected_division),
+            'avg': (2, lambda a, b: (a + b) / 2),
+            'log': (1, self.protected_log),
+            'sqrt': (1, self.protected_sqrt),
+            'min': (2, np.minimum),
+            'max': (2, np.maximum),
+            'pos': (1, lambda a: np.maximum(a, 0)),
+            'sin': (1, np.sin),
+            'cos': (1, np.cos),
+        }
+        self.lock = threading.Lock()
+        # Column vectors of evaluated subtrees, written in format (dataset key, DAG generation, node id): values
+        self.subtree_cache = LRUCache(subtree_cache_bytes)
+        self.generation = 0
+        self.clear()
+
+    def clear(self):
+        """Drop the expression DAG and the cached subtree values, e.g. once the data changes."""
+        with self.lock:
+            self.reset_dag()
+
+    def reset_dag(self):
+        # Must hold the lock, evaluations still running keep the node list they started with
+        self.compiled_functions = {}
+        self.nodes = []
+        self.node_ids = {}
+        self.generation += 1
+        self.subtree_cache.clear()
+
+    def protected_division(self, a, b):
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return np.where(np.abs(b) > self.DIVISION_EPSILON, a / b, 1.0)
+
+    def protected_log(self, a):
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return np.where(a > 0, np.log(np.where(a > 0, a, 1.0)), 1.0)
+
+    def protected_sqrt(self, a):
+        return np.sqrt(np.abs(a))
+
+    def compile(self, prefix_function):
+        """Return the DAG generation, node list and root node of the prefix function in the shared expression DAG."""
+        with self.lock:
+            compiled = self.compiled_functions.get(prefix_function)
+            if compiled is None:
+                if len(self.nodes) >= self.MAX_NODES or len(self.compiled_functions) >= self.MAX_NODES:
+                    self.reset_dag()
+                compiled = (self.generation, self.nodes, self.compile_tokens(prefix_function))
+                self.compiled_functions[prefix_function] = compiled
+            return compiled
+
+    def compile_tokens(self, prefix_function):
+        # Must hold the lock
+        tokens = prefix_function.split()
+        if not tokens:
+            raise ValueError("Cannot compile an empty prefix function")
+
+        # Prefix notation is read backwards, so every function finds its arguments on the stack
+        stack = []
+        for token in reversed(tokens):
+            node = self.compile_token(token)
+            arity = node[1] if node[0] == 'function' else 0
+            if len(stack) < arity:
+                raise ValueError(f"Function '{token}' is missing arguments in '{prefix_function}'")
+            children = tuple(stack.pop() for _ in range(arity))
+            stack.append(self.intern_node(node, children))
+
+        if len(stack) != 1:
+            raise ValueError(f"Invalid prefix function: '{prefix_function}'")
+        return stack[0]
+
+    def intern_node(self, node, children):
+        # Equal subtrees are hash-consed into a single node, shared by every function containing them
+        key = (node[0], node[-1] if node[0] != 'function' else node[3], children)
+        if key not in self.node_ids:
+            self.node_ids[key] = len(self.nodes)
+            self.nodes.append((node, children))
+        return self.node_ids[key]
+
+    def compile_token(self, token):
+        if token in self.functions:
+            arity, implementation = self.functions[token]
+            return ('function', arity, implementation, token)
+
+        match = self.VARIABLE_PATTERN.match(token)
+        if match:
+            return ('variable', int(match.group(1)) - 1)
+
+        # Ephemeral random constants are written either as plain numbers or with ECF's "D_" type prefix
+        constant = token[2:] if token.startswith('D_') else token
+        try:
+            return ('constant', float(constant))
+        except ValueError:
+            raise ValueError(f"Unknown primitive '{token}'")
+
+    def evaluate(self, prefix_function, variables, target=None, linear_scaling=False, dataset_key=None, coefficients=None):
+        """Evaluate a prefix function over variable columns (x1, x2, ...) and return predictions as an array.
+
+        Subtree results are cached under dataset_key, which has to change whenever the variables do.
+        linear_scaling fits the scaling to target, fixed coefficients (a, b) fit on other data are applied as they are.
+        """
+        generation, nodes, root = self.compile(prefix_function)
+        num_rows = len(variables[0]) if len(variables) > 0 else len(target)
+
+        cache_key = (dataset_key, generation) if dataset_key is not None else None
+        result = self.evaluate_node(nodes, root, variables, cache_key, {})
+        predictions = np.broadcast_to(np.asarray(result, dtype=float), (num_rows,)).copy()
+
+        if linear_scaling:
+            if target is None:
+                raise ValueError("Linear scaling requires target values")
+            predictions = self.apply_linear_scaling(predictions, np.asarray(target, dtype=float))
+        elif coefficients is not None:
+            a, b = coefficients
+            predictions = a + b * predictions
+
+        return predictions
+
+    def fit_linear_scaling(self, prefix_function, variables, target, dataset_key=None):
+        """Return the linear scaling coefficients (a, b) of a prefix function on the given data."""
+        scaling = ScalingAccumulator()
+        scaling.add(self.evaluate(prefix_function, variables, target=target, dataset_key=dataset_key), target)
+        return scaling.coefficients()
+
+    def evaluate_node(self, nodes, node_id, variables, cache_key, values):
+        if node_id in values:
+            return values[node_id]
+
+        node, children = nodes[node_id]
+        if node[0] == 'variable':
+            index = node[1]
+            if index >= len(variables):
+                raise ValueError(f"Variable x{index + 1} is not present in the input data")
+            # Columns are used as they are, without converting or copying them
+            value = np.asarray(variables[index])
+        elif node[0] == 'constant':
+            value = node[1]
+        else:
+            value = self.subtree_cache.get((*cache_key, node_id)) if cache_key is not None else None
+            if value is None:
+                value = node[2](*[self.evaluate_node(nodes, child, variables, cache_key, values) for child in children])
+                if cache_key is not None:
+                    self.subtree_cache.put((*cache_key, node_id), value)
+
+        values[node_id] = value
+        return value
+
+    def apply_linear_scaling(self, predictions, target):
+        # Least squares fit of target ~ a + b * predictions, as ECF does when linear_scaling is enabled
+        scaling = ScalingAccumulator()
+        scaling.add(predictions, target)
+        a, b = scaling.coefficients()
+        return a + b * predictions
+
+    def calculate_error(self, predictions, target, error_metric='mean_square_error'):
+        residuals = np.asarray(target) - predictions
+        if error_metric == 'mean_absolute_error':
+            return float(np.mean(np.abs(residuals)))
+        if error_metric == 'mean_absolute_percentage_error':
+            with np.errstate(divide='ignore', invalid='ignore'):
+                percentages = np.abs(residuals / target)
+            return float(np.mean(percentages[np.isfinite(percentages)]) * 100)
+        return float(np.mean(residuals ** 2))
@@ -0,0 +1,119 @@
+import os
+import glob
+import hashlib
+import numpy as np
+from utils.file import delete_file_if_exists
+from utils.instrumentation import get_logger
+
+logger = get_logger('loader')
+
+class DataLoader:
+    """Loads delimited input files as (columns, rows) arrays, backed by a memory-mapped .npy cache."""
+    CHUNK_ROWS = 500000
+
+    def __init__(self, cache_directory='srm/cache', dtype=np.float64):
+        self.cache_directory = cache_directory
+        self.dtype = np.dtype(dtype)
+        # Last array loaded for each path, so repeated loads of an unchanged file are free
+        self.loaded = {}
+
+    def load(self, file_path, use_cache=True):
+        stat = os.stat(file_path)
+        key = (os.path.abspath(file_path), stat.st_mtime_ns, stat.st_size, self.dtype.str)
+        if file_path in self.loaded and self.loaded[file_path][0] == key:
+            return self.loaded[file_path][1]
+
+        cache_path = self.get_cache_path(key) if use_cache else None
+        data = None
+        if cache_path is not None and os.path.exists(cache_path):
+            try:
+                data = np.load(cache_path, mmap_mode='r')
+            except (OSError, ValueError) as e:
+                logger.warning("Error reading data cache", path=cache_path, error=str(e))
+
+        if data is None:
+            if cache_path is not None:
+                data = self.write_cache(cache_path, file_path)
+            else:
+                data = self.read_text(file_path)
+
+        self.loaded[file_path] = (key, data)
+        return data
+
+    def get_cache_path(self, key):
+        path_digest = hashlib.blake2b(key[0].encode(), digest_size=8).hexdigest()
+        key_digest = hashlib.blake2b(repr(key[1:]).encode(), digest_size=8).hexdigest()
+        return os.path.join(self.cache_directory, f"{path_digest}-{key_digest}.npy")
+
+    def write_cache(self, cache_path, file_path):
+        # The text file is streamed block by block into the cache, so files larger than memory can be loaded
+        # Evaluation servers may load the same file at once, each writes its own temporary file and replaces the cache atomically
+        temp_path = f"{cache_path}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(self.cache_directory, exist_ok=True)
+            # Caches of older versions of the same file are never read again
+            path_prefix = os.path.basename(cache_path).split('-')[0]
+            for stale_path in glob.glob(os.path.join(self.cache_directory, f"{path_prefix}-*.npy")):
+                if stale_path != cache_path:
+                    try:
+                        os.remove(stale_path)
+                    except FileNotFoundError:
+                        pass
+
+            num_rows = self.count_rows(file_path)
+            data = None
+            start = 0
+            for block in self.iter_text_blocks(file_path):
+                if data is None:
+                    data = np.lib.format.open_memmap(temp_path, mode='w+', dtype=self.dtype, shape=(block.shape[0], num_rows))
+                data[:, start:start + block.shape[1]] = block
+                start += block.shape[1]
+            if data is None:
+                raise ValueError(f"No data found in {file_path}")
+            data.flush()
+            del data
+            os.replace(temp_path, cache_path)
+            return np.load(cache_path, mmap_mode='r')
+        except OSError as e:
+            logger.warning("Error writing data cache", path=cache_path, error=str(e))
+            delete_file_if_exists(temp_path)
+            return self.read_text(file_path)
+        except BaseException:
+            # Parsing errors, e.g. a header row, are raised to the caller without leaving the partial cache behind
+            delete_file_if_exists(temp_path)
+            raise
+
+    def count_rows(self, file_path):
+        # Blank lines are skipped by the reader, so they are not counted either
+        with open(file_path, 'rb') as file:
+            return sum(1 for line in file if line.strip())
+
+    def detect_delimiter(self, file_path):
+        with open(file_path, 'r') as file:
+            first_line = file.readline()
+        if '\t' in first_line:
+            return '\t'
+        if ',' in first_line:
+            return ','
+        return r'\s+'
+
+    def read_text(self, file_path):
+        blocks = list(self.iter_text_blocks(file_path))
+        if not blocks:
+            raise ValueError(f"No data found in {file_path}")
+        return np.concatenate(blocks, axis=1) if len(blocks) > 1 else blocks[0]
+
+    def iter_text_blocks(self, file_path, block_rows=None):
+        """Yield the rows of a delimited file as contiguous (columns, rows) blocks of at most block_rows rows."""
+        import pandas as pd
+
+        delimiter = self.detect_delimiter(file_path)
+        for chunk in pd.read_csv(file_path, sep=delimiter, header=None, dtype=self.dtype, chunksize=block_rows or self.CHUNK_ROWS):
+            # Switch rows and columns (transpose) into one contiguous column-major block
+            yield np.ascontiguousarray(chunk.to_numpy(dtype=self.dtype).T)
+
+    def iter_blocks(self, data, block_rows=None):
+        # Slices of a memory-mapped cache are only read from disk when they are used
+        block_rows = block_rows or self.CHUNK_ROWS
+        for start in range(0, data.shape[1], block_rows):
+            yield data[:, start:start + block_rows]
@@ -1,21 +1,59 @@
 import numpy as np
 import os
+import glob
+import threading
+import math
+from concurrent.futures import ThreadPoolExecutor
+from collections import Counter
 import json
 from .config import ConfigurationManager
+from .evaluator import ExpressionEvaluator
+from .parser import BestFileParser
+from .pareto import ParetoFront
+from .loader import DataLoader
+from .split import DataSplitter
+from .evaluation_server import EvaluationServer
+from .test_evaluation import TestEvaluationQueue
+from .sharded import ShardedEvaluator
+from .streaming import StreamingEvaluator
+from .plot import PlotDecimator
+from .scheduler import TemplateScheduler
 from .parameters import param_paths
 from utils.helper import set_to_string, string_to_set
 from utils.file import create_directory, delete_file_if_exists
 from utils.publisher import Publisher
+from utils.cache import LRUCache, function_digest
+from utils.instrumentation import get_logger, instrumentation
+
+logger = get_logger('model')
 
 class Model(Publisher):
     config_path = 'config.json'
+    FUNCTION_SOLUTIONS_CACHE_BYTES = 256 * 1024 * 1024
+    TEST_EVALUATION_WORKERS = 2
+    SHARDED_EVALUATION_ROWS = 5000000
+    STREAMING_EVALUATION_ROWS = 20000000
 
     def __init__(self):
         super().__init__()
         with open(self.config_path, 'r') as file:
             self.config = json.load(file)
 
+        # Datasets are kept as (columns, rows) arrays, so every column is contiguous
+        self.data_dtype = np.dtype(self.config.get("data_dtype", "float64"))
+        self.data_loader = DataLoader(dtype=self.data_dtype)
+        self.data_splitter = DataSplitter()
+
         self.config_manager = ConfigurationManager()
+        self.evaluator = ExpressionEvaluator()
+        # Datasets with at least this many rows are evaluated in shards on a process pool
+        self.sharded_evaluation_rows = self.config.get("sharded_evaluation_rows", self.SHARDED_EVALUATION_ROWS)
+        self.sharded_evaluator = None
+        self.sharded_evaluator_lock = threading.Lock()
+        # Datasets with at least this many rows are evaluated block by block from their memory-mapped cache
+        self.streaming_evaluation_rows = self.config.get("streaming_evaluation_rows", self.STREAMING_EVALUATION_ROWS)
+        self.streaming_evaluator = StreamingEvaluator(self.evaluator)
+        self.predictions_directory = os.path.join(self.data_loader.cache_directory, 'predictions')
 
         self.configs = {}
         self.process_states = {}
@@ -24,10 +62,13 @@ class Model(Publisher):
         self.params = {}
         self.train_test_split = 1
         self.test_sample = None
+        # A fixed seed repeats the same random split in every run, without one every run draws a new split
+        self.split_seed = self.config.get("split_seed")
         self.plot_x_index = None
         self.plot_y_index = None
         self.plot_scale = None
         self.plot_type = None
+        self.plot_decimator = PlotDecimator()
         self.best_file = self.config["best_file_path"]
         self.thread_num = 1
 
@@ -36,11 +77,24 @@ class Model(Publisher):
         self.input_data = None
         self.train_input_data = None
         self.test_input_data = None
+        # Incremented whenever the datasets change, so cached subtree values of older data are never reused
+        self.data_version = 0
         self.data_type = 'input'
-        self.function_solutions = {}
+        self.function_solutions = LRUCache(self.FUNCTION_SOLUTIONS_CACHE_BYTES)
+        self.evaluation_servers = []
+        self.evaluation_executor = ThreadPoolExecutor(max_workers=self.TEST_EVALUATION_WORKERS, thread_name_prefix="ecf-evaluation")
+        self.test_evaluation_queue = TestEvaluationQueue(self.evaluate_test_functions)
+        self.test_evaluation_queue.register_callback('solutions_evaluated', lambda function, solutions: self.update_function_solutions(function, solutions, 'test'))
+        self.test_evaluation_queue.register_callback('functions_evaluated', self.add_best_functions)
         self.multivar = False
         self.enabled_functions = set()
         self.best_functions = None
+        # The aggregate front reports its changes, which are published to the views as 'best_functions_changed'
+        self.pareto_front = ParetoFront(track_changes=True)
+        self.change_lock = threading.Lock()
+        # With several templates, every run of a worker may use another one, chosen by how much each currently adds to the front
+        self.adaptive_scheduling = self.config.get("adaptive_scheduling", True)
+        self.scheduler = None
 
     def set_variable(self, name, value):
         if name in param_paths:
@@ -117,7 +171,7 @@ class Model(Publisher):
         elif type == 'test':
             return self.test_input_data
         else:
-            print("Invalid data type requested.")
+            logger.warning("Invalid data type requested", data_type=type)
             return None
         
     def get_data_type(self):
@@ -130,55 +184,188 @@ class Model(Publisher):
         return self.train_test_split < 1
     
     def get_function_solutions(self, function, data_type):
-        if function in self.function_solutions:
-            if data_type in self.function_solutions[function]:
-                return self.function_solutions[function][data_type]
-        return None
+        return self.function_solutions.get((function, data_type))
     
+    def evaluate_prefix_function(self, prefix_function, data_type='train'):
+        data = self.get_data(data_type)
+        if data is None:
+            return None
+        with instrumentation.span('evaluate.function'):
+            # The training set is scaled with its own fit, data with test rows with the training set's so the test targets stay held out
+            linear_scaling = self.get_linear_scaling()
+            coefficients = None
+            if linear_scaling and data_type != 'train' and self.is_test():
+                linear_scaling = False
+                coefficients = self.fit_linear_scaling([prefix_function])[0]
+                if isinstance(coefficients, Exception):
+                    raise coefficients
+            if self.use_streaming_evaluation(data):
+                return self.evaluate_streaming(prefix_function, data, data_type, linear_scaling, coefficients)[1]
+            if self.use_sharded_evaluation(data):
+                result = self.get_sharded_evaluator().evaluate_batch([prefix_function], data, self.get_error_metric(), linear_scaling=linear_scaling, coefficients=[coefficients])[0]
+                if isinstance(result, Exception):
+                    raise result
+                return result[1]
+            return self.evaluator.evaluate(prefix_function, data[:-1], target=data[-1], linear_scaling=linear_scaling, dataset_key=(data_type, self.data_version), coefficients=coefficients)
+
+    def fit_linear_scaling(self, prefix_functions):
+        """Return the linear scaling (a, b) of every prefix function fit on the training set, failed fits are returned as exceptions."""
+        data = self.train_input_data
+        if self.use_sharded_evaluation(data) and not self.use_streaming_evaluation(data):
+            return self.get_sharded_evaluator().fit_batch(prefix_functions, data)
+        results = []
+        for prefix_function in prefix_functions:
+            try:
+                if self.use_streaming_evaluation(data):
+                    results.append(self.streaming_evaluator.fit_linear_scaling(prefix_function, self.data_loader.iter_blocks(data)))
+                else:
+                    results.append(self.evaluator.fit_linear_scaling(prefix_function, data[:-1], data[-1], dataset_key=('train', self.data_version)))
+            except Exception as e:
+                results.append(e)
+        return results
+
+    def use_streaming_evaluation(self, data):
+        return data is not None and data.shape[1] >= self.streaming_evaluation_rows
+
+    def evaluate_streaming(self, prefix_function, data, data_type, linear_scaling=False, coefficients=None):
+        # Predictions are spilled to disk, so they take no memory and are cheap to keep in function_solutions
+        scaled = 'scaled-' if linear_scaling or coefficients is not None else ''
+        output_path = os.path.join(self.predictions_directory, f"{data_type}-{self.data_version}-{scaled}{function_digest(prefix_function):016x}.f8")
+        return self.streaming_evaluator.evaluate(prefix_function, self.data_loader.iter_blocks(data), self.get_error_metric(), output_path=output_path, linear_scaling=linear_scaling, coefficients=coefficients)
+
+    def clear_predictions(self):
+        # Temporary files are only left behind by evaluations which were interrupted
+        for path in glob.glob(os.path.join(self.predictions_directory, '*.f8')) + glob.glob(os.path.join(self.predictions_directory, '*.f8.*.tmp')):
+            delete_file_if_exists(path)
+
+    def use_sharded_evaluation(self, data):
+        return data is not None and data.shape[1] >= self.sharded_evaluation_rows
+
+    def get_sharded_evaluator(self):
+        # Created by whichever of the GUI and the test queue needs it first
+        with self.sharded_evaluator_lock:
+            if self.sharded_evaluator is None:
+                self.sharded_evaluator = ShardedEvaluator()
+            return self.sharded_evaluator
+
+    def get_error_metric(self):
+        error_metric = self.params.get(param_paths["search_metric"])
+        if error_metric is None:
+            error_metric = self.config_manager.get_current_param_value(param_paths["search_metric"])
+        return error_metric or 'mean_square_error'
+
+    def get_linear_scaling(self):
+        # Errors and predictions are scaled the same way SRM scales them during the search
+        linear_scaling = self.params.get(param_paths["linear_scaling"])
+        if linear_scaling is None:
+            linear_scaling = self.config_manager.get_current_param_value(param_paths["linear_scaling"])
+        return linear_scaling == "true"
+
+    def start_evaluation_servers(self):
+        self.stop_evaluation_servers()
+        self.test_evaluation_queue.reset()
+        if self.use_streaming_evaluation(self.test_input_data) or self.use_sharded_evaluation(self.test_input_data):
+            return
+        for _ in range(self.TEST_EVALUATION_WORKERS):
+            server = EvaluationServer(self.test_file_path, self.get_error_metric(), command=self.config.get("evaluation_server_command"), dtype=self.data_dtype)
+            server.start()
+            self.evaluation_servers.append(server)
+
+    def stop_evaluation_servers(self):
+        for server in self.evaluation_servers:
+            server.stop()
+        self.evaluation_servers = []
+        with self.sharded_evaluator_lock:
+            sharded_evaluator = self.sharded_evaluator
+        if sharded_evaluator is not None:
+            sharded_evaluator.close()
+
+    def submit_test_functions(self, id, functions):
+        self.test_evaluation_queue.submit(id, functions)
+
+    def wait_for_test_evaluation(self, timeout=None):
+        self.test_evaluation_queue.wait(timeout)
+
+    def evaluate_test_functions(self, prefix_functions):
+        # Test predictions are scaled with the coefficients fit on the training set, a function whose fit failed is reported as failed
+        coefficients = self.fit_linear_scaling(prefix_functions) if self.get_linear_scaling() else [None] * len(prefix_functions)
+        indices = [index for index, function_coefficients in enumerate(coefficients) if not isinstance(function_coefficients, Exception)]
+        results = list(coefficients)
+        evaluated = self.evaluate_test_batch([prefix_functions[index] for index in indices], [coefficients[index] for index in indices])
+        for index, result in zip(indices, evaluated):
+            results[index] = result
+        return results
+
+    def evaluate_test_batch(self, prefix_functions, coefficients):
+        if not prefix_functions:
+            return []
+
+        if self.use_streaming_evaluation(self.test_input_data):
+            # Only the errors are needed here, so no prediction files are written
+            results = []
+            for prefix_function, function_coefficients in zip(prefix_functions, coefficients):
+                try:
+                    results.append(self.streaming_evaluator.evaluate(
+                        prefix_function, self.data_loader.iter_blocks(self.test_input_data), self.get_error_metric(), coefficients=function_coefficients, return_predictions=False
+                    ))
+                except Exception as e:
+                    results.append(e)
+            return results
+
+        if self.use_sharded_evaluation(self.test_input_data):
+            # Only the errors are needed here, predictions of a selected function are computed when it is plotted
+            return self.get_sharded_evaluator().evaluate_batch(prefix_functions, self.test_input_data, self.get_error_metric(), return_predictions=False, coefficients=coefficients)
+
+        # The batch is split evenly between the servers, which evaluate their parts concurrently
+        servers = self.evaluation_servers
+        if not servers:
+            return [ValueError("No evaluation server is running")] * len(prefix_functions)
+        chunk_size = math.ceil(len(prefix_functions) / len(servers))
+        futures = [
+            self.evaluation_executor.submit(server.evaluate_batch, prefix_functions[start:start + chunk_size], coefficients[start:start + chunk_size])
+            for server, start in zip(servers, range(0, len(prefix_functions), chunk_size))
+        ]
+        return [result for future in futures for result in future.result()]
+
     def update_function_solutions(self, function, solutions, data_type):
         if data_type != 'train' and data_type != 'test':
-            print("Invalid data type. Cannot update function_solutions. Must be 'train' or 'test'")
+            logger.warning("Invalid data type, function_solutions only holds 'train' and 'test'", data_type=data_type)
             return
         
-        if function not in self.function_solutions:
-            self.function_solutions[function] = {}
-
-        self.function_solutions[function][data_type] = solutions
+        self.function_solutions.put((function, data_type), solutions)
 
     def update_best_functions(self, copy=True):
         return self.update_aggregate_best_functions().copy() if copy else self.update_aggregate_best_functions()
         
     def get_best_functions(self, id=None, copy=True):
         if id is None:
-            if self.best_functions is not None:
-                return self.best_functions.copy() if copy else self.best_functions
-            else:
-                return None
+            return self.pareto_front.to_list()
         else:
-            return self.process_states[id]['best_functions'].copy() if copy else self.process_states[id]['best_functions']
+            return self.process_states[id]['best_functions'].to_list()
         
-    def set_best_functions(self, id, best_functions):
-        self.process_states[id]['best_functions'] = best_functions
+    def add_best_functions(self, id, functions):
+        # Every candidate goes into both fronts, the aggregate front equals the front of all processes' fronts
+        with instrumentation.span('pareto.merge'):
+            inserted = self.process_states[id]['best_functions'].insert_all(functions)
+            members = self.pareto_front.insert_all(inserted)
+        if self.scheduler is not None:
+            # Members are credited to the run which wrote them, test records are often only scored once it has ended
+            for run, count in Counter(member.get('run') for member in members).items():
+                self.scheduler.add_members(id, count, run)
+        instrumentation.count('pareto.candidates', len(functions))
+        instrumentation.count('pareto.inserted', len(inserted))
+        self.publish_best_functions_changes()
+        return inserted
+
+    def publish_best_functions_changes(self):
+        # Changes are popped and published under one lock, so subscribers receive them in the order they were made
+        with self.change_lock:
+            changes = self.pareto_front.pop_changes()
+            if changes:
+                self.invoke_callback('best_functions_changed', changes)
 
-    def get_test_configurations(self, id):
-        return self.config_manager.test_configurations[id]
-    
-    def get_evaluation_configurations(self, id):
-        if id not in self.config_manager.eval_configurations:
-            print(f"Configuration with id {id} not found")
-        return self.config_manager.eval_configurations[id]
-        
     def update_aggregate_best_functions(self):
-        all_best_functions = []
-        for id, value in self.process_states.items():
-
-            #print(f"\n\nvalue['best_functions'] for process {id}: {value['best_functions']}")
-
-            all_best_functions.extend(value['best_functions'])
-        
-        self.best_functions = self.filter_best_functions(all_best_functions)
-        #print(f"\nFiltered best_functions: {self.best_functions}\n")
-
+        self.best_functions = self.pareto_front.to_list()
         return self.best_functions
 
     def enable_function(self, function):
@@ -196,137 +383,122 @@ class Model(Publisher):
     def delete_best_functions(self):
         self.functions_seen = set()
         self.best_functions = []
+        self.pareto_front.clear()
+        self.publish_best_functions_changes()
         self.current_file_size = 0
 
     def reset_file_reading(self, id):
         self.process_states[id]['current_file_size'] = 0
+        self.process_states[id]['parser'].reset()
+        # Called once the scheduler has started the new run, records read from now on belong to it
+        self.process_states[id]['run'] = self.scheduler.get_run(id) if self.scheduler is not None else None
 
     def register_all_processes(self):
+        self.pareto_front.clear()
+        self.publish_best_functions_changes()
         for id in range(self.thread_num):
             self.register_process(id)
 
     def register_process(self, id):
         self.process_states[id] = {
-            'best_functions': [],
+            'best_functions': ParetoFront(),
             'functions_seen': set(),
             'current_file_size': 0,
+            'parser': BestFileParser(),
+            'run': None,
         }
 
     def load_input_data(self):
-        self.input_data = self.load_data(self.get_input_path())
+        input_data = self.load_data(self.get_input_path())
+        if input_data is not self.input_data:
+            self.data_version += 1
+            self.evaluator.clear()
+            self.plot_decimator.clear()
+        self.input_data = input_data
         self.multivar = len(self.input_data) > 2
-        return self.input_data.copy()
+        return self.input_data
 
-    def load_data(self, file_path):
+    def load_data(self, file_path, use_cache=True):
         try:
-            input_data = np.loadtxt(file_path, delimiter='\t')
-            converted_input_data = self.convert_to_2d_array(input_data)
+            with instrumentation.span('data.load'):
+                return self.data_loader.load(file_path, use_cache=use_cache)
         except Exception as e:
-            print(f"Error loading data: {e}")
+            logger.error("Error loading data", path=file_path, error=str(e))
             return None
 
-        return converted_input_data
-
-    def convert_to_2d_array(self, data):
-        converted_data = data.tolist()
-        # Switch rows and columns (transpose)
-        return np.transpose(converted_data).tolist()
+    def get_best_file_path(self, id):
+        return self.config_manager.configurations[id].best_file_path
 
     def parse_best_functions(self, id):
-        best_file_path = self.config_manager.configurations[id].best_file_path
-        print("Best file path: ", best_file_path, "for process ", id)
+        best_file_path = self.get_best_file_path(id)
+        logger.debug("Parsing best file", path=best_file_path, id=id)
         best_functions = self.parse_best_file(id, best_file_path)
         return best_functions
     
     def parse_best_file(self, id, file_path):
         state = self.process_states[id]
 
-        generation_data = {}
-        lines = []
-        new_data, state['current_file_size'] = self.read_new_data(file_path, state['current_file_size'])
+        previous_file_size = state['current_file_size']
+        with instrumentation.span('best_file.read'):
+            new_data, state['current_file_size'] = self.read_new_data(file_path, previous_file_size)
 
         if new_data is None:
-            return state['best_functions'].copy()
-
-        def process_generation_data():
-            # Only append if not seen and data is valid
-            if generation_data and 'prefix_function' in generation_data and generation_data['function'] not in state['functions_seen']:
-                state['best_functions'].append(generation_data.copy())
-                state['functions_seen'].add(generation_data['function'])  # Add to seen to prevent reprocessing
-
-        for line in new_data:
-            line = line.strip()
-            if line.isdigit():  # New generation
-                process_generation_data()
-                generation_data = {'generation': int(line)}  # reset with new generation
-            elif line:
-                lines.append(line)
-                if len(lines) == 5:
-                    self.process_line_block(lines, generation_data)
-                    lines = []
-
-        process_generation_data()  # Check after the last line has been processed
-
-        return state['best_functions'].copy()
+            return []
+
+        # The file was recreated, drop anything buffered from its previous contents
+        if state['current_file_size'] < previous_file_size:
+            state['parser'].reset()
+
+        instrumentation.count('best_file.read_bytes', len(new_data))
+        new_functions = []
+        with instrumentation.span('best_file.parse'):
+            for generation_data in state['parser'].feed(new_data):
+                # Only keep if not seen, the parser only yields complete records
+                digest = function_digest(generation_data['function'])
+                if digest not in state['functions_seen']:
+                    generation_data['run'] = state['run']
+                    new_functions.append(generation_data)
+                    state['functions_seen'].add(digest)  # Add to seen to prevent reprocessing
+        instrumentation.count('best_file.new_functions', len(new_functions))
+
+        return new_functions
     
     def has_new_data(self, id):
-        file_path = self.config_manager.configurations[id].best_file_path
-        state = self.process_states[id]
-        old_file_size = state['current_file_size']
-
-        new_data, current_file_size = self.read_new_data(file_path, old_file_size)
-
-        return old_file_size != current_file_size
+        file_path = self.get_best_file_path(id)
+        try:
+            # Only the size is needed here, the new data itself is read by the parser
+            return os.path.getsize(file_path) != self.process_states[id]['current_file_size']
+        except OSError:
+            return False
 
     def read_new_data(self, file_path, current_file_size):
-        # Get the current size of the file
-        if not os.path.exists(file_path):
-            print(f"File {file_path} does not exist")
+        try:
+            file = open(file_path, 'rb')
+        except FileNotFoundError:
+            logger.debug("Best file does not exist yet", path=file_path)
             return None, 0
-        
-        new_file_size = os.path.getsize(file_path)
-        new_data = None
 
-        # Read new data if the file size has increased
-        if new_file_size > current_file_size:
-            with open(file_path, 'r') as file:
-                # Seek to the last read position
-                file.seek(current_file_size)
+        new_data = None
+        with file:
+            # Get the current size of the file from the already open descriptor
+            new_file_size = os.fstat(file.fileno()).st_size
 
-                # Read new data
-                new_data = file.read(new_file_size - current_file_size).split("\n")
+            # The file was recreated by a restarted process, start reading from the beginning
+            if new_file_size < current_file_size:
+                current_file_size = 0
+                new_data = b''
 
-            # Update the last read size
-            current_file_size = new_file_size
+            # Read only the data appended since the last read
+            if new_file_size > current_file_size:
+                file.seek(current_file_size)
+                new_data = file.read(new_file_size - current_file_size)
+                current_file_size = new_file_size
 
         return new_data, current_file_size
 
-    def process_line_block(self, lines, generation_data):
-        # Parsing lines for required information
-        function_line, _, fitness_line, tree_line, _ = lines
-        generation_data.update({
-            'function': function_line,
-            'error': float(fitness_line.split('"')[1]),
-            'size': int(tree_line.split('"')[1]),
-            'prefix_function': tree_line.split(">")[1].split("<")[0]
-        })
-
     def filter_best_functions(self, data):
-        if len(data) == 0:
-            return data
-        # Sort the data by size first, then by error in ascending order
-        sorted_data = sorted(data, key=lambda x: (x['size'], x['error']))
-
-        # Prepare the filtered list of best functions
-        filtered_functions = []
-        last_valid_error = float('inf')  # Set a high initial error to compare against
-
-        for function in sorted_data:
-            if function['error'] < last_valid_error:
-                filtered_functions.append(function)
-                last_valid_error = function['error']  # Update the last valid error to the current one
-
-        return filtered_functions
+        # Keep only functions which have a lower error than every smaller function
+        return ParetoFront(data).to_list()
 
     def get_plot_data(self, type='input'):
         data = None
@@ -339,24 +511,77 @@ class Model(Publisher):
             data = self.test_input_data
 
         if data is None:
-            print("No data to plot")
+            logger.debug("No data to plot", data_type=type)
             return None, None
         
         x_index = self.plot_x_index if self.plot_x_index is not None else -1
 
         if x_index == -1:
-            x_data = list(range(len(data[0])))
+            x_data = np.arange(len(data[0]))
         else:
             x_data = data[x_index]
 
         y_data = data[-1]
 
         return x_data, y_data
+
+    def get_plot_series(self, data_type, function=None, function_results=None, pixels=1000):
+        """Return the decimated (x, y) series of the data and of the function for the current plot options."""
+        x_data, y_data = self.get_plot_data(data_type)
+        if x_data is None or y_data is None:
+            return None, None
+
+        plot_y_index = self.plot_y_index or 0
+        log_x = self.plot_scale in (2, 3)
+        key = ((data_type, self.data_version), self.plot_x_index)
+
+        data_series = None
+        if plot_y_index == 0:
+            # Data is always drawn as a scatter plot
+            data_series = self.plot_decimator.decimate((*key, None, plot_y_index), lambda: (x_data, y_data), "scatter", pixels, log_x)
+
+        function_series = None
+        if function_results is not None:
+            get_series = lambda: self.get_function_plot_values(x_data, y_data, function_results, plot_y_index)
+            function_series = self.plot_decimator.decimate((*key, function, plot_y_index), get_series, self.plot_type or "scatter", pixels, log_x)
+
+        return data_series, function_series
+
+    def get_function_plot_values(self, x_data, y_data, function_results, plot_y_index):
+        function_results = np.asarray(function_results)
+        if plot_y_index == 0:
+            return x_data, function_results
+
+        residuals = np.subtract(y_data, function_results)
+        if plot_y_index == 1:
+            return x_data, residuals
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            residual_percent = np.abs(residuals / y_data) * 100
+        valid_mask = np.isfinite(residual_percent)
+        return np.asarray(x_data)[valid_mask], residual_percent[valid_mask]
     
     def split_train_test(self):
-        self.config_manager.split_train_test(self.get_input_path(), train_output_path=self.train_file_path, test_output_path=self.test_file_path, train_test_split_ratio=self.train_test_split, test_sample_choice=self.test_sample)
-        self.train_input_data = self.load_data(self.train_file_path)
-        self.test_input_data = self.load_data(self.test_file_path)
+        with instrumentation.span('data.split'):
+            self.split_input_data()
+        # Cached solutions belong to the previous train/test data
+        self.data_version += 1
+        self.evaluator.clear()
+        self.function_solutions.clear()
+        self.plot_decimator.clear()
+        self.clear_predictions()
+
+    def split_input_data(self):
+        input_data = self.load_input_data()
+        # Drawn once, so the split files and the arrays in memory hold the same rows
+        seed = self.split_seed if self.split_seed is not None else np.random.SeedSequence().entropy
+        self.data_splitter.write_split_files(self.get_input_path(), self.train_file_path, self.test_file_path, input_data.shape[1], self.train_test_split, self.test_sample, seed)
+        if self.use_streaming_evaluation(input_data) and self.is_test():
+            # Indexing rows out of a dataset larger than memory would copy it, the written split files get their own memory-mapped caches
+            self.train_input_data = self.load_data(self.train_file_path)
+            self.test_input_data = self.load_data(self.test_file_path)
+        else:
+            self.train_input_data, self.test_input_data = self.data_splitter.split(input_data, self.train_test_split, self.test_sample, seed)
 
     def update_default_parameters_file(self):
         self.config_manager.update_config(self.params)
@@ -365,24 +590,28 @@ class Model(Publisher):
     def get_parameters_paths(self):
         return [self.config_manager.configurations[id]['parameters_path'] for id in range(self.thread_num)]
     
-    def create_process_config(self, process_id, is_test=False, delete_logs=False):
+    def create_scheduler(self):
+        templates = self.config_manager.default_parameters_paths
+        if self.adaptive_scheduling and len(templates) > 1:
+            self.scheduler = TemplateScheduler(templates, half_life=self.config.get("scheduler_half_life", TemplateScheduler.HALF_LIFE))
+        else:
+            self.scheduler = None
+        return self.scheduler
+
+    def create_process_config(self, process_id, is_test=False, delete_logs=False, params=None, template_path=None):
         base_process_path = f'srm/temp/{process_id}'
         create_directory(base_process_path)
-        parameters_path = f'{base_process_path}/parameters{"_test" if is_test else ""}.txt'
+        # Every template gets its own parameters file, so a worker switching templates reuses the file written before
+        template_name = f"_{os.path.splitext(os.path.basename(template_path))[0]}" if template_path else ""
+        parameters_path = f'{base_process_path}/parameters{"_test" if is_test else ""}{template_name}.txt'
         input_file_path = self.test_file_path if is_test else self.train_file_path
         best_file_path = f'{base_process_path}/best{"_test" if is_test else ""}.txt'
         log_file_path = f'{base_process_path}/log{"_test" if is_test else ""}.txt'
         self.config_manager.create_config(
-            process_id=process_id, parameters_path=parameters_path, input_file_path=input_file_path, best_file_path=best_file_path, log_file_path=log_file_path, is_test=is_test or process_id=='eval'
+            process_id=process_id, parameters_path=parameters_path, input_file_path=input_file_path, best_file_path=best_file_path, log_file_path=log_file_path, is_test=is_test or process_id=='eval', params=params, template_path=template_path
         )
         if delete_logs:
             delete_file_if_exists(best_file_path)
             delete_file_if_exists(log_file_path)
 
-        return parameters_path
-
-    def create_individual_file(self, file_path, error, size, prefix_function):
-        return self.config_manager.create_individual_file(file_path, error, size, prefix_function)
-
-    def parse_best_individual_file(self, file_path):
-        return self.config_manager.parse_best_individual_file(file_path)
\ No newline at end of file
+        return parameters_path
\ No newline at end of file
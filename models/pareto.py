@@ -0,0 +1,87 @@
+import threading
+from bisect import bisect_right
+from utils.cache import function_digest
+
+def get_function_id(function):
+    # Stable id of a function, at most one function on a front has a given infix string
+    return function_digest(function['function'])
+
+class ParetoFront:
+    """Size/error Pareto front kept sorted by size, so errors are strictly decreasing along the front."""
+
+    def __init__(self, functions=None, track_changes=False):
+        self.sizes = []
+        self.functions = []
+        self.lock = threading.Lock()
+        # Changes since the last pop_changes, replaying them in order turns the previous front into the current one
+        self.changes = [] if track_changes else None
+        if functions is not None:
+            self.insert_all(functions)
+
+    def __len__(self):
+        return len(self.functions)
+
+    def __iter__(self):
+        return iter(self.to_list())
+
+    def insert(self, function):
+        """Insert a function if no smaller or equally sized function has a lower or equal error, returns whether it was inserted."""
+        size, error = function['size'], function['error']
+        with self.lock:
+            index = bisect_right(self.sizes, size)
+            if index > 0 and self.functions[index - 1]['error'] <= error:
+                return False
+
+            # An equally sized function with a higher error is dominated as well
+            if index > 0 and self.sizes[index - 1] == size:
+                index -= 1
+
+            # Dominated functions form a contiguous run starting at the insertion point
+            end = index
+            while end < len(self.functions) and self.functions[end]['error'] >= error:
+                end += 1
+
+            if self.changes is not None:
+                self.record_changes(index, end, function)
+            self.sizes[index:end] = [size]
+            self.functions[index:end] = [function]
+            return True
+
+    def record_changes(self, index, end, function):
+        function_id = get_function_id(function)
+        removed_ids = [get_function_id(removed) for removed in self.functions[index:end]]
+        if function_id not in removed_ids:
+            self.changes.extend(('remove', index, removed_id) for removed_id in removed_ids)
+            self.changes.append(('insert', index, function_id, function))
+            return
+
+        # The same function with a lower error only changes its error, the rest of the run is removed around it
+        position = removed_ids.index(function_id)
+        self.changes.extend(('remove', index, removed_id) for removed_id in removed_ids[:position])
+        self.changes.append(('update', index, function_id, function))
+        self.changes.extend(('remove', index + 1, removed_id) for removed_id in removed_ids[position + 1:])
+
+    def insert_all(self, functions):
+        return [function for function in functions if self.insert(function)]
+
+    def merge(self, other):
+        return self.insert_all(other.to_list())
+
+    def clear(self):
+        with self.lock:
+            self.sizes = []
+            self.functions = []
+            if self.changes is not None:
+                # Earlier changes are replaced, they are undone by the clear anyway
+                self.changes = [('clear',)]
+
+    def pop_changes(self):
+        with self.lock:
+            changes = self.changes or []
+            if self.changes is not None:
+                self.changes = []
+            return changes
+
+    def to_list(self):
+        with self.lock:
+            return list(self.functions)
@@ -0,0 +1,59 @@
+import re
+
+class BestFileParser:
+    """Resumable parser for ECF best files, fed with the bytes appended since the previous read."""
+    FITNESS_PATTERN = re.compile(r'<Fitness\w*\s+value="([^"]*)"')
+    TREE_PATTERN = re.compile(r'<Tree\s+size="(\d+)"\s*>(.*?)</Tree>')
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.buffer = b''
+        self.generation = None
+        self.function = None
+        self.record = None
+
+    def feed(self, data):
+        """Yield every individual completed by data, keeping partial lines and records for the next call."""
+        self.buffer += data
+        lines = self.buffer.split(b'\n')
+        # The last element is either empty or a line which is still being written
+        self.buffer = lines.pop()
+
+        for line in lines:
+            record = self.parse_line(line.decode(errors='replace').strip())
+            if record is not None:
+                yield record
+
+    def parse_line(self, line):
+        if not line:
+            return None
+
+        if line.isdigit():  # New generation
+            self.generation = int(line)
+            self.function = None
+            self.record = None
+        elif line.startswith('<Individual'):
+            self.record = {'generation': self.generation, 'function': self.function}
+        elif line.startswith('</Individual'):
+            record, self.record = self.record, None
+            if record is not None and 'error' in record and 'prefix_function' in record and record['function'] is not None:
+                return record
+        elif self.record is not None:
+            self.parse_record_line(line)
+        elif not line.startswith('<'):
+            # Infix form of the individual written before its XML record
+            self.function = line
+        return None
+
+    def parse_record_line(self, line):
+        fitness_match = self.FITNESS_PATTERN.search(line)
+        if fitness_match:
+            self.record['error'] = float(fitness_match.group(1))
+            return
+
+        tree_match = self.TREE_PATTERN.search(line)
+        if tree_match:
+            self.record['size'] = int(tree_match.group(1))
+            self.record['prefix_function'] = tree_match.group(2).strip()
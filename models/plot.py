@@ -0,0 +1,70 @@
+import numpy as np
+from utils.cache import LRUCache
+
+class PlotDecimator:
+    """Reduces large plot series to about as many points as the canvas can show, caching the results."""
+    SCATTER_POINTS = 20000
+    CACHE_BYTES = 64 * 1024 * 1024
+
+    def __init__(self, scatter_points=SCATTER_POINTS, seed=0):
+        self.scatter_points = scatter_points
+        self.seed = seed
+        # Decimated series, written in format (dataset, x index, function, series, plot type, pixels): (x, y)
+        self.cache = LRUCache(self.CACHE_BYTES)
+
+    def decimate(self, key, get_series, plot_type="scatter", pixels=1000, log_x=False):
+        """Return the decimated (x, y) series for key, get_series is only called to compute a series which isn't cached."""
+        cache_key = (*key, plot_type, pixels, log_x)
+        series = self.cache.get(cache_key)
+        if series is None:
+            x, y = get_series()
+            x = np.asarray(x)
+            y = np.asarray(y)
+            if plot_type == "scatter":
+                series = self.subsample(x, y)
+            else:
+                series = self.min_max(x, y, pixels, log_x)
+            self.cache.put(cache_key, series)
+        return series
+
+    def subsample(self, x, y):
+        # A fixed random sample keeps the look of the point cloud, and the same points are drawn for every function
+        if len(x) <= self.scatter_points:
+            return x, y
+        indices = np.sort(np.random.default_rng(self.seed).choice(len(x), self.scatter_points, replace=False))
+        return x[indices], y[indices]
+
+    def min_max(self, x, y, pixels, log_x=False):
+        # Every pixel column keeps only its lowest and highest value, which draws the same envelope as all of the points
+        pixels = max(int(pixels), 1)
+        if len(x) <= 2 * pixels:
+            return x, y
+
+        position = np.log10(np.where(x > 0, x, np.nan)) if log_x else x.astype(float)
+        finite = np.isfinite(position) & np.isfinite(y)
+        if not finite.all():
+            x, y, position = x[finite], y[finite], position[finite]
+            if len(x) == 0:
+                return x, y
+        low, high = position.min(), position.max()
+        if high == low:
+            columns = np.zeros(len(x), dtype=np.int64)
+        else:
+            columns = np.minimum(((position - low) / (high - low) * pixels).astype(np.int64), pixels - 1)
+
+        order = np.argsort(columns, kind='stable')
+        columns = columns[order]
+        starts = np.flatnonzero(np.r_[True, columns[1:] != columns[:-1]])
+        sorted_x = x[order]
+        sorted_y = y[order]
+
+        # Points are drawn at the mean x of their pixel column, first the minimum and then the maximum
+        column_x = np.add.reduceat(sorted_x.astype(float), starts) / np.diff(np.r_[starts, len(x)])
+        decimated_x = np.repeat(column_x, 2)
+        decimated_y = np.empty(2 * len(starts), dtype=float)
+        decimated_y[0::2] = np.minimum.reduceat(sorted_y, starts)
+        decimated_y[1::2] = np.maximum.reduceat(sorted_y, starts)
+        return decimated_x, decimated_y
+
+    def clear(self):
+        self.cache.clear()
@@ -0,0 +1,145 @@
+import os
+import time
+import random
+import threading
+from utils.instrumentation import get_logger, instrumentation
+
+logger = get_logger('scheduler')
+
+class TemplateScheduler:
+    """Treats every SRM run as a job and gives each new job the template whose runs currently add the most members to the Pareto front."""
+    HALF_LIFE = 600  # Seconds after which a new member or a second of work counts half as much
+    EXPLORATION = 0.1  # Share of jobs spread evenly, so a stagnated template is still tried now and then
+    PRIOR_SECONDS = 60
+    MIN_JOB_SECONDS = 60
+    STALL_SECONDS = 120
+    KEPT_RUNS = 4  # Finished runs of a worker kept for records which are only scored after the worker has moved on
+
+    def __init__(self, templates, half_life=HALF_LIFE, exploration=EXPLORATION, seed=None):
+        # Templates are written in format (path, weight), the weights are the shares before anything has been measured
+        self.weights = dict(templates)
+        self.half_life = half_life
+        self.exploration = exploration
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+
+        # Decayed yield of every template, written in format template: [members, seconds]
+        self.stats = {template: [0.0, 0.0] for template in self.weights}
+        self.runs = {template: 0 for template in self.weights}
+        self.updated = time.monotonic()
+        # Generated configs are reused by every later job of a worker, written in format id: {template: parameters path}
+        self.parameters_paths = {}
+        # Written in format (id, run): {'template', 'started', 'running', 'last_member'}, kept after a job ends so late records are still credited to it
+        self.jobs = {}
+        # Number of the latest run of every worker, written in format id: run
+        self.current_runs = {}
+
+    def set_parameters_paths(self, id, parameters_paths):
+        with self.lock:
+            self.parameters_paths[id] = dict(parameters_paths)
+
+    def start_job(self, id):
+        """Choose the template of a worker's next run and return its parameters path."""
+        with self.lock:
+            now = self.advance()
+            yields = self.get_yields()
+            total = sum(yields.values())
+            shares = {
+                template: (1 - self.exploration) * value / total + self.exploration / len(yields)
+                for template, value in yields.items()
+            }
+            template = self.random.choices(list(shares), weights=list(shares.values()), k=1)[0]
+            run = self.current_runs.get(id, 0) + 1
+            self.current_runs[id] = run
+            self.jobs[(id, run)] = {'template': template, 'started': now, 'running': True, 'last_member': now}
+            self.jobs.pop((id, run - self.KEPT_RUNS), None)
+            self.runs[template] += 1
+
+        instrumentation.count(f"scheduler.runs.{self.get_name(template)}")
+        logger.debug("Assigned template", id=id, template=template, shares={self.get_name(key): round(value, 3) for key, value in shares.items()})
+        return self.parameters_paths[id][template]
+
+    def finish_job(self, id):
+        with self.lock:
+            self.advance()
+            job = self.get_job(id)
+            if job is not None:
+                job['running'] = False
+
+    def pause_job(self, id):
+        self.finish_job(id)
+
+    def resume_job(self, id):
+        with self.lock:
+            self.advance()
+            job = self.get_job(id)
+            if job is not None:
+                job['running'] = True
+
+    def get_run(self, id):
+        return self.current_runs.get(id)
+
+    def get_job(self, id, run=None):
+        return self.jobs.get((id, run if run is not None else self.current_runs.get(id)))
+
+    def add_members(self, id, count, run=None):
+        """Credit new members of the aggregate Pareto front to the template of the run which wrote them, the worker's latest run by default."""
+        if count <= 0:
+            return
+        with self.lock:
+            now = self.advance()
+            job = self.get_job(id, run)
+            if job is not None:
+                self.stats[job['template']][0] += count
+                job['last_member'] = now
+
+    def should_preempt(self, id):
+        """Whether a running job has stalled while another template yields far more, so its worker should move on."""
+        with self.lock:
+            now = self.advance()
+            job = self.get_job(id)
+            if job is None or not job['running']:
+                return False
+            if now - job['started'] < self.MIN_JOB_SECONDS or now - job['last_member'] < self.STALL_SECONDS:
+                return False
+            yields = self.get_yields()
+            best_template = max(yields, key=yields.get)
+            return best_template != job['template'] and yields[best_template] > 2 * yields[job['template']]
+
+    def get_template(self, id):
+        job = self.get_job(id)
+        return job['template'] if job is not None else None
+
+    def advance(self):
+        # Decays the old measurements and adds the time every running job has worked since the previous call, must hold the lock
+        now = time.monotonic()
+        elapsed = now - self.updated
+        if elapsed > 0:
+            decay = 0.5 ** (elapsed / self.half_life)
+            for stats in self.stats.values():
+                stats[0] *= decay
+                stats[1] *= decay
+            for job in self.jobs.values():
+                if job['running']:
+                    self.stats[job['template']][1] += elapsed
+            self.updated = now
+        return now
+
+    def get_yields(self):
+        # New members per second of work, the prior keeps templates without measurements at their configured share
+        return {
+            template: (members + self.weights[template]) / (seconds + self.PRIOR_SECONDS)
+            for template, (members, seconds) in self.stats.items()
+        }
+
+    def get_name(self, template):
+        return os.path.splitext(os.path.basename(template))[0]
+
+    def report(self):
+        with self.lock:
+            self.advance()
+            yields = self.get_yields()
+            return {
+                self.get_name(template): {'runs': self.runs[template], 'members': members, 'seconds': seconds, 'yield': yields[template]}
+                for template, (members, seconds) in self.stats.items()
+            }
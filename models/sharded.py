@@ -0,0 +1,178 @@
+import math
+import threading
+import multiprocessing
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from .evaluator import ExpressionEvaluator, ScalingAccumulator
+from .streaming import ErrorAccumulator
+
+# Shared memory blocks and evaluator of a worker process, reused by every task the worker runs
+attached_blocks = {}
+worker_evaluator = None
+
+def open_block(name):
+    # Workers share the parent's resource tracker, the blocks are only unlinked by the parent
+    return shared_memory.SharedMemory(name=name)
+
+def attach_block(name, shape, dtype):
+    if name not in attached_blocks:
+        # Only the most recent dataset stays attached
+        for block in attached_blocks.values():
+            block.close()
+        attached_blocks.clear()
+        attached_blocks[name] = open_block(name)
+    return np.ndarray(shape, dtype=dtype, buffer=attached_blocks[name].buf)
+
+def predict_shard(data_block, prefix_function, start, end):
+    global worker_evaluator
+    if worker_evaluator is None:
+        worker_evaluator = ExpressionEvaluator()
+
+    data = attach_block(*data_block)[:, start:end]
+    # Every dataset gets a new block name, so the name and rows identify the shard's data for the subtree cache
+    return data, worker_evaluator.evaluate(prefix_function, data[:-1], dataset_key=(data_block[0], start, end))
+
+def fit_shard(data_block, prefix_function, start, end):
+    """Evaluate rows [start, end) of the shared dataset and return their ScalingAccumulator."""
+    data, predictions = predict_shard(data_block, prefix_function, start, end)
+    scaling = ScalingAccumulator()
+    scaling.add(predictions, data[-1])
+    return scaling
+
+def evaluate_shard(data_block, prefix_function, start, end, error_metric, output_block=None, coefficients=None):
+    """Evaluate rows [start, end) of the shared dataset and return the ErrorAccumulator of those rows.
+
+    Predictions are linearly scaled with coefficients (a, b) when they are given.
+    """
+    data, predictions = predict_shard(data_block, prefix_function, start, end)
+    if coefficients is not None:
+        a, b = coefficients
+        predictions = a + b * predictions
+
+    if output_block is not None:
+        # Output blocks change with every function, so they are not kept attached
+        name, shape, dtype = output_block
+        block = open_block(name)
+        np.ndarray(shape, dtype=dtype, buffer=block.buf)[start:end] = predictions
+        block.close()
+
+    accumulator = ErrorAccumulator(error_metric)
+    accumulator.add(predictions, data[-1])
+    return accumulator
+
+class ShardedEvaluator:
+    """Evaluates functions over large datasets by sharding rows across a process pool attached to shared memory."""
+    SHARD_ROWS = 1000000
+
+    def __init__(self, max_workers=None):
+        self.max_workers = max_workers
+        self.executor = None
+        self.data = None
+        self.data_block = None
+        # The GUI and the test queue share one evaluator, a batch holds the attached dataset until it is done
+        self.lock = threading.RLock()
+
+    def attach(self, data):
+        # The dataset is copied into shared memory once and reused until a different dataset is evaluated
+        if self.data is data:
+            return
+        self.release_data()
+        block = shared_memory.SharedMemory(create=True, size=max(data.nbytes, 1))
+        np.ndarray(data.shape, dtype=data.dtype, buffer=block.buf)[:] = data
+        self.data = data
+        self.data_block = block
+
+    def get_executor(self):
+        if self.executor is None:
+            # Forking a process which runs Tk and asyncio threads can copy held locks, workers start from a clean forkserver instead
+            self.executor = ProcessPoolExecutor(max_workers=self.max_workers, mp_context=multiprocessing.get_context('forkserver'))
+        return self.executor
+
+    def evaluate_batch(self, prefix_functions, data, error_metric='mean_square_error', return_predictions=True, linear_scaling=False, coefficients=None):
+        """Return (error, predictions) for every prefix function, failed evaluations are returned as exceptions.
+
+        With return_predictions=False only the errors are computed and predictions are None.
+        With linear_scaling every function is evaluated twice, first to fit the scaling and then to apply it.
+        Otherwise coefficients may give fixed (a, b) for every function, e.g. fit on the training set.
+        """
+        if coefficients is None:
+            coefficients = [None] * len(prefix_functions)
+        with self.lock:
+            self.attach(data)
+            executor = self.get_executor()
+            return [
+                self.evaluate_function(executor, prefix_function, data, error_metric, return_predictions, linear_scaling, function_coefficients)
+                for prefix_function, function_coefficients in zip(prefix_functions, coefficients)
+            ]
+
+    def fit_batch(self, prefix_functions, data):
+        """Return the linear scaling coefficients (a, b) of every prefix function, failed fits are returned as exceptions."""
+        with self.lock:
+            self.attach(data)
+            executor = self.get_executor()
+            data_block = (self.data_block.name, data.shape, data.dtype.str)
+            results = []
+            for prefix_function in prefix_functions:
+                try:
+                    results.append(self.fit_scaling(executor, data_block, prefix_function, data.shape[1]))
+                except Exception as e:
+                    results.append(e)
+            return results
+
+    def get_shards(self, num_rows):
+        num_shards = max(1, math.ceil(num_rows / self.SHARD_ROWS))
+        return [(shard * self.SHARD_ROWS, min(num_rows, (shard + 1) * self.SHARD_ROWS)) for shard in range(num_shards)]
+
+    def fit_scaling(self, executor, data_block, prefix_function, num_rows):
+        scaling = ScalingAccumulator()
+        for future in [executor.submit(fit_shard, data_block, prefix_function, start, end) for start, end in self.get_shards(num_rows)]:
+            scaling.merge(future.result())
+        return scaling.coefficients()
+
+    def evaluate_function(self, executor, prefix_function, data, error_metric, return_predictions, linear_scaling=False, coefficients=None):
+        num_rows = data.shape[1]
+        data_block = (self.data_block.name, data.shape, data.dtype.str)
+
+        # Predictions get a block of their own, so a batch never needs more than one function's worth of shared memory
+        output = None
+        output_block = None
+        if return_predictions:
+            output = shared_memory.SharedMemory(create=True, size=max(num_rows * 8, 1))
+            output_block = (output.name, (num_rows,), '<f8')
+
+        try:
+            accumulator = ErrorAccumulator(error_metric)
+            try:
+                if linear_scaling:
+                    coefficients = self.fit_scaling(executor, data_block, prefix_function, num_rows)
+                futures = [
+                    executor.submit(evaluate_shard, data_block, prefix_function, start, end, error_metric, output_block, coefficients)
+                    for start, end in self.get_shards(num_rows)
+                ]
+                for future in futures:
+                    accumulator.merge(future.result())
+            except Exception as e:
+                return e
+            error = accumulator.result()
+            predictions = np.ndarray((num_rows,), dtype='<f8', buffer=output.buf).copy() if return_predictions else None
+            return error, predictions
+        finally:
+            if output is not None:
+                output.close()
+                output.unlink()
+
+    def release_data(self):
+        if self.data_block is not None:
+            self.data_block.close()
+            self.data_block.unlink()
+        self.data = None
+        self.data_block = None
+
+    def close(self):
+        # Stops the workers and frees the shared dataset once the running batch is done, the next evaluation starts them again
+        with self.lock:
+            if self.executor is not None:
+                self.executor.shutdown(cancel_futures=True)
+                self.executor = None
+            self.release_data()
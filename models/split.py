@@ -0,0 +1,73 @@
+import os
+import math
+import shutil
+import numpy as np
+from utils.file import delete_file_if_exists
+
+class DataSplitter:
+    """Splits (columns, rows) arrays into train and test sets using cached row indices."""
+
+    def __init__(self):
+        # Only the latest split is kept, a new seed every run would otherwise keep every run's indices
+        self.indices_key = None
+        self.indices = None
+        self.written_key = None
+
+    def get_key(self, train_test_split_ratio, test_sample_choice, seed):
+        # The seed only matters for random samples
+        return (train_test_split_ratio, test_sample_choice, seed if test_sample_choice == "random" else None)
+
+    def get_indices(self, num_rows, train_test_split_ratio, test_sample_choice, seed):
+        key = (num_rows, *self.get_key(train_test_split_ratio, test_sample_choice, seed))
+        if key != self.indices_key:
+            num_test = math.ceil(num_rows * (1 - train_test_split_ratio))
+            if test_sample_choice == "random":
+                permutation = np.random.default_rng(seed).permutation(num_rows)
+                # Sorted indices keep the rows in their original order
+                self.indices = (np.sort(permutation[num_test:]), np.sort(permutation[:num_test]))
+            else:
+                # Sequential samples are plain slices, so both sets are views of the input data
+                self.indices = (slice(0, num_rows - num_test), slice(num_rows - num_test, num_rows))
+            self.indices_key = key
+        return self.indices
+
+    def split(self, data, train_test_split_ratio=1, test_sample_choice="random", seed=0):
+        """Return the train and test sets, only sequential samples are views, random samples copy their rows out of data."""
+        if train_test_split_ratio == 1:
+            return data, None
+
+        train_indices, test_indices = self.get_indices(data.shape[1], train_test_split_ratio, test_sample_choice, seed)
+        return data[:, train_indices], data[:, test_indices]
+
+    def write_split_files(self, input_data_path, train_output_path, test_output_path, num_rows, train_test_split_ratio=1, test_sample_choice="random", seed=0):
+        stat = os.stat(input_data_path)
+        key = (os.path.abspath(input_data_path), stat.st_mtime_ns, stat.st_size, *self.get_key(train_test_split_ratio, test_sample_choice, seed))
+        output_paths = [train_output_path] if train_test_split_ratio == 1 else [train_output_path, test_output_path]
+        # The engine's input files are only rewritten when the data or the split changed
+        if key == self.written_key and all(os.path.exists(path) for path in output_paths):
+            return False
+
+        delete_file_if_exists(train_output_path)
+        delete_file_if_exists(test_output_path)
+
+        if train_test_split_ratio == 1:
+            shutil.copyfile(input_data_path, train_output_path)
+        else:
+            test_mask = np.zeros(num_rows, dtype=bool)
+            test_mask[self.get_indices(num_rows, train_test_split_ratio, test_sample_choice, seed)[1]] = True
+            self.write_lines(input_data_path, train_output_path, test_output_path, test_mask)
+
+        self.written_key = key
+        return True
+
+    def write_lines(self, input_data_path, train_output_path, test_output_path, test_mask):
+        # Lines are copied unchanged, so values are not reformatted and no number parsing is needed
+        row = 0
+        with open(input_data_path, 'rb') as source, open(train_output_path, 'wb') as train_file, open(test_output_path, 'wb') as test_file:
+            for line in source:
+                if not line.strip():
+                    continue
+                if not line.endswith(b'\n'):
+                    line += b'\n'
+                (test_file if test_mask[row] else train_file).write(line)
+                row += 1
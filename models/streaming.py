@@ -0,0 +1,133 @@
+import os
+import tempfile
+import numpy as np
+from .evaluator import ExpressionEvaluator, ScalingAccumulator
+
+class ErrorAccumulator:
+    """Accumulates an error metric block by block, so the whole dataset never has to be in memory."""
+
+    def __init__(self, error_metric='mean_square_error'):
+        self.error_metric = error_metric
+        self.error_sum = 0.0
+        self.count = 0
+
+    def add(self, predictions, target):
+        residuals = np.asarray(target) - predictions
+        if self.error_metric == 'mean_absolute_error':
+            self.error_sum += float(np.sum(np.abs(residuals)))
+            self.count += len(residuals)
+        elif self.error_metric == 'mean_absolute_percentage_error':
+            with np.errstate(divide='ignore', invalid='ignore'):
+                percentages = np.abs(residuals / target)
+            finite = np.isfinite(percentages)
+            self.error_sum += float(np.sum(percentages[finite]) * 100)
+            self.count += int(np.count_nonzero(finite))
+        else:
+            self.error_sum += float(np.sum(residuals ** 2))
+            self.count += len(residuals)
+
+    def merge(self, other):
+        # Combines the partial sums of another accumulator, e.g. of a shard evaluated elsewhere
+        self.error_sum += other.error_sum
+        self.count += other.count
+
+    def result(self):
+        return self.error_sum / self.count if self.count > 0 else float('nan')
+
+class StreamingEvaluator:
+    """Evaluates functions over (columns, rows) blocks of a dataset and optionally spills predictions to a memory-mapped file."""
+
+    def __init__(self, evaluator=None):
+        self.evaluator = evaluator if evaluator is not None else ExpressionEvaluator()
+
+    def evaluate(self, prefix_function, blocks, error_metric='mean_square_error', output_path=None, linear_scaling=False, coefficients=None, return_predictions=True):
+        """Return the error and predictions of a prefix function, predictions are memory-mapped when output_path is given.
+
+        With linear_scaling the blocks are read twice, the scaling is only known once every block has been evaluated.
+        Fixed coefficients (a, b), e.g. fit on the training set, are applied in a single pass.
+        With return_predictions=False only the error is computed, nothing is written and predictions are None.
+        """
+        if not return_predictions:
+            return self.evaluate_error(prefix_function, blocks, error_metric, linear_scaling, coefficients), None
+        if linear_scaling:
+            blocks = list(blocks)
+        accumulator = ErrorAccumulator(error_metric)
+        scaling = ScalingAccumulator() if linear_scaling else None
+        predictions = []
+        output = None
+        temp_path = None
+
+        try:
+            if output_path is not None:
+                # Every evaluation writes its own temporary file, the same function may be evaluated by two threads at once
+                directory = os.path.dirname(output_path) or '.'
+                os.makedirs(directory, exist_ok=True)
+                file_descriptor, temp_path = tempfile.mkstemp(prefix=f"{os.path.basename(output_path)}.", suffix='.tmp', dir=directory)
+                output = os.fdopen(file_descriptor, 'wb')
+
+            for block in blocks:
+                # Blocks share the compiled function, but their subtree values are not cached
+                block_predictions = self.evaluator.evaluate(prefix_function, block[:-1], target=block[-1], coefficients=coefficients)
+                if scaling is not None:
+                    scaling.add(block_predictions, block[-1])
+                else:
+                    accumulator.add(block_predictions, block[-1])
+                if output is not None:
+                    output.write(block_predictions.astype('<f8').tobytes())
+                else:
+                    predictions.append(block_predictions)
+
+            if output is not None:
+                output.close()
+                if scaling is not None:
+                    self.scale_file(temp_path, blocks, scaling, accumulator)
+            elif scaling is not None:
+                a, b = scaling.coefficients()
+                predictions = [a + b * block_predictions for block_predictions in predictions]
+                for block, block_predictions in zip(blocks, predictions):
+                    accumulator.add(block_predictions, block[-1])
+        except BaseException:
+            if output is not None:
+                output.close()
+            if temp_path is not None:
+                os.remove(temp_path)
+            raise
+
+        if output is not None:
+            os.replace(temp_path, output_path)
+            if os.path.getsize(output_path) == 0:
+                return accumulator.result(), np.empty(0)
+            return accumulator.result(), np.memmap(output_path, dtype='<f8', mode='r')
+
+        return accumulator.result(), np.concatenate(predictions) if predictions else np.empty(0)
+
+    def evaluate_error(self, prefix_function, blocks, error_metric='mean_square_error', linear_scaling=False, coefficients=None):
+        if linear_scaling:
+            blocks = list(blocks)
+            coefficients = self.fit_linear_scaling(prefix_function, blocks)
+        accumulator = ErrorAccumulator(error_metric)
+        for block in blocks:
+            accumulator.add(self.evaluator.evaluate(prefix_function, block[:-1], target=block[-1], coefficients=coefficients), block[-1])
+        return accumulator.result()
+
+    def fit_linear_scaling(self, prefix_function, blocks):
+        """Return the linear scaling coefficients (a, b) of a prefix function, fit block by block."""
+        scaling = ScalingAccumulator()
+        for block in blocks:
+            scaling.add(self.evaluator.evaluate(prefix_function, block[:-1], target=block[-1]), block[-1])
+        return scaling.coefficients()
+
+    def scale_file(self, path, blocks, scaling, accumulator):
+        # Spilled predictions are scaled in place, block by block, so they never have to fit in memory
+        if os.path.getsize(path) == 0:
+            return
+        a, b = scaling.coefficients()
+        spilled = np.memmap(path, dtype='<f8', mode='r+')
+        start = 0
+        for block in blocks:
+            end = start + block.shape[1]
+            spilled[start:end] = a + b * spilled[start:end]
+            accumulator.add(spilled[start:end], block[-1])
+            start = end
+        spilled.flush()
+        del spilled
@@ -0,0 +1,101 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from utils.cache import function_digest
+from utils.publisher import Publisher
+from utils.instrumentation import get_logger, instrumentation
+
+logger = get_logger('test_evaluation')
+
+class TestEvaluationQueue(Publisher):
+    """Collects new candidates from all processes and scores them on the test set in deduplicated batches."""
+
+    def __init__(self, evaluate_batch):
+        super().__init__()
+        self.evaluate_batch = evaluate_batch
+        self.pending = []
+        self.errors = {}
+        self.failed = set()
+        self.draining = False
+        # Bumped by reset, batches taken before a reset belong to the previous run and their results are dropped
+        self.generation = 0
+        self.lock = threading.Lock()
+        # Scoring runs on its own thread, so it never holds up reading the best files
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="ecf-test-evaluation")
+
+    def reset(self):
+        with self.lock:
+            self.pending = []
+            self.errors = {}
+            self.failed = set()
+            self.generation += 1
+
+    def submit(self, id, functions):
+        if not functions:
+            return
+        with self.lock:
+            self.pending.extend((id, function) for function in functions)
+            if self.draining:
+                return
+            self.draining = True
+        self.executor.submit(self.drain)
+
+    def wait(self, timeout=None):
+        # Batches are scored one after another on a single thread, so this returns once everything submitted so far is scored
+        self.executor.submit(lambda: None).result(timeout)
+
+    def drain(self):
+        # Everything submitted while a batch is being scored goes into the next batch
+        while True:
+            with self.lock:
+                batch, self.pending = self.pending, []
+                if not batch:
+                    self.draining = False
+                    return
+                generation, errors, failed = self.generation, self.errors, self.failed
+            try:
+                self.evaluate(batch, generation, errors, failed)
+            except Exception as e:
+                logger.error("Error evaluating test batch", error=str(e))
+
+    def evaluate(self, batch, generation, errors, failed):
+        # Results go into the errors and failed sets of the batch's own run, which a reset has already replaced if it is stale
+        unique_functions = {}
+        for id, generation_data in batch:
+            digest = function_digest(generation_data['function'])
+            if digest not in errors and digest not in failed and digest not in unique_functions:
+                unique_functions[digest] = generation_data
+
+        if unique_functions:
+            with instrumentation.span('test_evaluation.batch'):
+                results = self.evaluate_batch([generation_data['prefix_function'] for generation_data in unique_functions.values()])
+            instrumentation.count('test_evaluation.functions', len(unique_functions))
+            if self.is_stale(generation):
+                return
+            for (digest, generation_data), result in zip(unique_functions.items(), results):
+                if isinstance(result, Exception):
+                    logger.warning("Error evaluating function on test data", function=generation_data['function'], error=str(result))
+                    failed.add(digest)
+                    continue
+                error, solutions = result
+                errors[digest] = error
+                if solutions is not None:
+                    self.invoke_callback('solutions_evaluated', generation_data['function'], solutions)
+
+        evaluated = {}
+        for id, generation_data in batch:
+            digest = function_digest(generation_data['function'])
+            if digest in errors:
+                generation_data['error'] = errors[digest]  # Update error after test evaluation
+                evaluated.setdefault(id, []).append(generation_data)
+
+        if self.is_stale(generation):
+            return
+        for id, functions in evaluated.items():
+            self.invoke_callback('functions_evaluated', id, functions)
+
+    def is_stale(self, generation):
+        with self.lock:
+            stale = generation != self.generation
+        if stale:
+            logger.debug("Dropped test batch of a previous run", generation=generation)
+        return stale
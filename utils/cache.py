@@ -0,0 +1,61 @@
+import sys
+import threading
+import hashlib
+from collections import OrderedDict
+
+def function_digest(function):
+    # 64-bit digest used instead of the full function string in deduplication sets
+    return int.from_bytes(hashlib.blake2b(function.encode(), digest_size=8).digest(), 'little')
+
+def estimate_size(value):
+    # Memory-mapped arrays (numpy.memmap) are backed by a file and take almost no memory themselves
+    if getattr(value, 'filename', None) is not None:
+        return sys.getsizeof(value)
+    if hasattr(value, 'nbytes'):
+        return value.nbytes
+    if isinstance(value, tuple):
+        return sys.getsizeof(value) + sum(estimate_size(item) for item in value)
+    if isinstance(value, list):
+        return sys.getsizeof(value) + len(value) * sys.getsizeof(0.0)
+    return sys.getsizeof(value)
+
+class LRUCache:
+    """Thread safe least recently used cache bounded by the estimated size of its values in bytes."""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, key):
+        return key in self.entries
+
+    def get(self, key, default=None):
+        with self.lock:
+            if key not in self.entries:
+                return default
+            self.entries.move_to_end(key)
+            return self.entries[key][0]
+
+    def put(self, key, value):
+        size = estimate_size(value)
+        with self.lock:
+            if key in self.entries:
+                self.current_bytes -= self.entries.pop(key)[1]
+            # Values larger than the whole cache are not stored at all
+            if size > self.max_bytes:
+                return
+            self.entries[key] = (value, size)
+            self.current_bytes += size
+            while self.current_bytes > self.max_bytes:
+                _, (_, evicted_size) = self.entries.popitem(last=False)
+                self.current_bytes -= evicted_size
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.current_bytes = 0
@@ -1,4 +1,7 @@
 import os
+from utils.instrumentation import get_logger
+
+logger = get_logger('file')
 
 def delete_file_if_exists(file_path):
         if os.path.exists(file_path):
@@ -7,7 +10,7 @@ def delete_file_if_exists(file_path):
 def delete_all_files_in_directory(directory):
     # Check if the directory exists
     if not os.path.exists(directory):
-        print(f"Directory '{directory}' does not exist.")
+        logger.warning("Directory does not exist", path=directory)
         return
     
     for root, dirs, files in os.walk(directory, topdown=False):
@@ -15,23 +18,23 @@ def delete_all_files_in_directory(directory):
             file_path = os.path.join(root, file)
             try:
                 os.remove(file_path)  # Delete the file
-                print(f"Deleted file: {file_path}")
+                logger.debug("Deleted file", path=file_path)
             except Exception as e:
-                print(f"Error deleting file {file_path}: {e}")
+                logger.error("Error deleting file", path=file_path, error=str(e))
         
         for dir in dirs:
             dir_path = os.path.join(root, dir)
             try:
                 os.rmdir(dir_path)  # Delete the directory
-                print(f"Deleted directory: {dir_path}")
+                logger.debug("Deleted directory", path=dir_path)
             except Exception as e:
-                print(f"Error deleting directory {dir_path}: {e}")
+                logger.error("Error deleting directory", path=dir_path, error=str(e))
 
 def create_directory(directory_path):
     try:
         os.makedirs(directory_path)
-        print(f"Directory created successfully: {directory_path}")
+        logger.debug("Directory created", path=directory_path)
     except FileExistsError:
         pass
     except Exception as e:
-        print(f"Error creating directory '{directory_path}': {e}")
\ No newline at end of file
+        logger.error("Error creating directory", path=directory_path, error=str(e))
\ No newline at end of file
@@ -0,0 +1,140 @@
+import os
+import json
+import time
+import logging
+import threading
+from contextlib import contextmanager
+
+LOGGER_NAME = 'ecfpydesk'
+
+class StructuredFormatter(logging.Formatter):
+    """Formats log records as 'time level logger message key=value ...' or as one JSON object per line."""
+
+    def __init__(self, json_format=False):
+        super().__init__()
+        self.json_format = json_format
+
+    def format(self, record):
+        fields = getattr(record, 'fields', {})
+        if self.json_format:
+            entry = {'time': record.created, 'level': record.levelname, 'logger': record.name, 'message': record.getMessage(), **fields}
+            return json.dumps(entry, default=str)
+        timestamp = time.strftime('%H:%M:%S', time.localtime(record.created))
+        text = f"{timestamp} {record.levelname:<7} {record.name} {record.getMessage()}"
+        if fields:
+            text += ' ' + ' '.join(f"{key}={value!r}" for key, value in fields.items())
+        if record.exc_info:
+            text += '\n' + self.formatException(record.exc_info)
+        return text
+
+class StructuredLogger:
+    """Logger taking structured fields as keyword arguments, e.g. logger.info("Process started", id=0)."""
+
+    def __init__(self, name):
+        self.logger = logging.getLogger(name)
+
+    def log(self, level, message, **fields):
+        if self.logger.isEnabledFor(level):
+            self.logger.log(level, message, extra={'fields': fields})
+
+    def debug(self, message, **fields):
+        self.log(logging.DEBUG, message, **fields)
+
+    def info(self, message, **fields):
+        self.log(logging.INFO, message, **fields)
+
+    def warning(self, message, **fields):
+        self.log(logging.WARNING, message, **fields)
+
+    def error(self, message, **fields):
+        self.log(logging.ERROR, message, **fields)
+
+def get_logger(name):
+    return StructuredLogger(f"{LOGGER_NAME}.{name}")
+
+def configure_logging(level='INFO', json_format=False):
+    """Send the application's log to stderr, a level of 'OFF' switches logging off."""
+    logger = logging.getLogger(LOGGER_NAME)
+    for handler in list(logger.handlers):
+        logger.removeHandler(handler)
+    logger.propagate = False
+
+    if str(level).upper() == 'OFF':
+        # Above every level, and the null handler keeps logging's last resort handler from printing anyway
+        logger.setLevel(logging.CRITICAL + 1)
+        logger.addHandler(logging.NullHandler())
+        return
+    logger.setLevel(str(level).upper())
+    handler = logging.StreamHandler()
+    handler.setFormatter(StructuredFormatter(json_format))
+    logger.addHandler(handler)
+
+class Instrumentation:
+    """Named timing spans and counters across the run/refresh/evaluate pipeline, exportable as a JSON report."""
+
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.started = time.time()
+            # Written in format name: [count, total seconds, max seconds, last seconds]
+            self.spans = {}
+            self.counters = {}
+
+    @contextmanager
+    def span(self, name):
+        if not self.enabled:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_span(name, time.perf_counter() - start)
+
+    def add_span(self, name, seconds):
+        with self.lock:
+            span = self.spans.setdefault(name, [0, 0.0, 0.0, 0.0])
+            span[0] += 1
+            span[1] += seconds
+            span[2] = max(span[2], seconds)
+            span[3] = seconds
+
+    def count(self, name, value=1):
+        if not self.enabled:
+            return
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def report(self):
+        with self.lock:
+            return {
+                'started': self.started,
+                'uptime_seconds': time.time() - self.started,
+                'spans': {
+                    name: {
+                        'count': count,
+                        'total_seconds': total,
+                        'mean_seconds': total / count,
+                        'max_seconds': maximum,
+                        'last_seconds': last,
+                    }
+                    for name, (count, total, maximum, last) in sorted(self.spans.items())
+                },
+                'counters': dict(sorted(self.counters.items())),
+            }
+
+    def export(self, file_path):
+        directory = os.path.dirname(file_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        temp_path = f"{file_path}.tmp"
+        with open(temp_path, 'w') as file:
+            json.dump(self.report(), file, indent=4)
+        os.replace(temp_path, file_path)
+
+# Shared by the whole application, spans and counters are switched off with "instrumentation": false in config.json
+instrumentation = Instrumentation()
@@ -1,3 +1,7 @@
+from utils.instrumentation import get_logger
+
+logger = get_logger('publisher')
+
 class Publisher():
     def __init__(self):
         self.callbacks = {}
@@ -12,4 +16,4 @@ class Publisher():
             for callback in self.callbacks[name]:
                 callback(*args, **kwargs)
         else:
-            print(f"No callback registered under the name: {name}:: {args}")
\ No newline at end of file
+            logger.debug("No callback registered", name=name, args=args)
\ No newline at end of file
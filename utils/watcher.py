@@ -0,0 +1,127 @@
+import ctypes
+import ctypes.util
+import os
+import struct
+import sys
+from utils.instrumentation import get_logger
+
+logger = get_logger('watcher')
+
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+INOTIFY_EVENT = struct.Struct('iIII')
+WATCH_MASK = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE
+
+class PollingFileWatcher:
+    """Calls back when a watched file changes size, checked with a single stat call every poll interval."""
+
+    def __init__(self, loop, poll_interval=1):
+        self.loop = loop
+        self.poll_interval = poll_interval
+        self.watches = {}
+
+    def watch(self, path, callback):
+        self.unwatch(path)
+        self.watches[path] = {'callback': callback, 'size': self.get_size(path), 'handle': None}
+        self.schedule_poll(path)
+
+    def unwatch(self, path):
+        watch = self.watches.pop(path, None)
+        if watch is not None and watch['handle'] is not None:
+            watch['handle'].cancel()
+
+    def schedule_poll(self, path):
+        self.watches[path]['handle'] = self.loop.call_later(self.poll_interval, self.poll, path)
+
+    def poll(self, path):
+        watch = self.watches.get(path)
+        if watch is None:
+            return
+        size = self.get_size(path)
+        if size != watch['size']:
+            watch['size'] = size
+            watch['callback'](path)
+        if path in self.watches:
+            self.schedule_poll(path)
+
+    def get_size(self, path):
+        try:
+            return os.stat(path).st_size
+        except OSError:
+            return 0
+
+    def close(self):
+        for path in list(self.watches):
+            self.unwatch(path)
+
+class InotifyFileWatcher:
+    """Calls back when a watched file is written, woken by Linux inotify events on the file's directory."""
+
+    def __init__(self, loop):
+        self.loop = loop
+        self.libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        self.fd = self.libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        # Directories are watched so files can be created or replaced after the watch is added
+        self.directories = {}
+        self.watches = {}
+        self.loop.add_reader(self.fd, self.read_events)
+
+    def watch(self, path, callback):
+        path = os.path.abspath(path)
+        directory, name = os.path.split(path)
+        wd = self.libc.inotify_add_watch(self.fd, os.fsencode(directory), WATCH_MASK)
+        if wd < 0:
+            raise OSError(ctypes.get_errno(), f"Could not watch directory {directory}")
+        self.directories[wd] = directory
+        self.watches.setdefault(wd, {})[name] = callback
+
+    def unwatch(self, path):
+        path = os.path.abspath(path)
+        directory, name = os.path.split(path)
+        for wd, watched_directory in list(self.directories.items()):
+            if watched_directory == directory and name in self.watches.get(wd, {}):
+                del self.watches[wd][name]
+                if not self.watches[wd]:
+                    self.libc.inotify_rm_watch(self.fd, wd)
+                    del self.watches[wd]
+                    del self.directories[wd]
+
+    def read_events(self):
+        try:
+            buffer = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return
+
+        # Several writes can be coalesced into one read, each file is notified at most once
+        changed = {}
+        offset = 0
+        while offset + INOTIFY_EVENT.size <= len(buffer):
+            wd, mask, cookie, length = INOTIFY_EVENT.unpack_from(buffer, offset)
+            name = buffer[offset + INOTIFY_EVENT.size:offset + INOTIFY_EVENT.size + length].rstrip(b'\0').decode()
+            offset += INOTIFY_EVENT.size + length
+            callback = self.watches.get(wd, {}).get(name)
+            if callback is not None:
+                changed[os.path.join(self.directories[wd], name)] = callback
+
+        for path, callback in changed.items():
+            callback(path)
+
+    def close(self):
+        self.loop.remove_reader(self.fd)
+        os.close(self.fd)
+        self.directories = {}
+        self.watches = {}
+
+def create_file_watcher(loop, poll_interval=1):
+    if sys.platform.startswith('linux'):
+        try:
+            return InotifyFileWatcher(loop)
+        except (OSError, AttributeError) as e:
+            logger.warning("Inotify is not available, falling back to polling", error=str(e))
+    return PollingFileWatcher(loop, poll_interval)
@@ -1,8 +1,11 @@
 import customtkinter as ctk
 from tkinter import StringVar, IntVar, Text, END
 from utils.parameters import search_options
+from utils.instrumentation import get_logger
 from .base import BaseView
 
+logger = get_logger('input_view')
+
 class InputView(BaseView):
     FG_COLOR = "#008000"
 
@@ -70,7 +73,7 @@ class InputView(BaseView):
         ctk.CTkEntry(frame, textvariable=self.terminal_set).grid(row=start_row+2, column=1, sticky='ew', padx=5, pady=5)
 
     def populate_terminal_scroll_frame(self, var_num, curr_terminal_set, terminal_set_without_vars):
-        print("Current terminal set: ", curr_terminal_set)
+        logger.debug("Populating terminal set", terminal_set=curr_terminal_set)
         self.terminal_set.set(terminal_set_without_vars)
         self.variable_checkboxes = {}
 
@@ -1,8 +1,11 @@
 from .navigation import NavigationView
 from .input import InputView
-from .results import ResultsView
+from .results import ResultsView, preload_plotting
 import customtkinter as ctk
 from tkinter import messagebox
+from utils.instrumentation import get_logger
+
+logger = get_logger('view')
 
 
 class View(ctk.CTk):
@@ -11,6 +14,7 @@ class View(ctk.CTk):
         ctk.set_default_color_theme("dark-blue")  # Themes: blue (default), dark-blue, green
 
         super().__init__()
+        preload_plotting()
         self.frames = {}
         self.initialize_ui()
 
@@ -55,13 +59,14 @@ class View(ctk.CTk):
     def show_results(self):
         self.input_frame.grid_remove()
         self.results_frame.grid(row=1, column=1, sticky='nsew', padx=20, pady=10)
+        self.results_frame.create_plot()
         self.navigation_frame.input_button.configure(fg_color="#f0f0f0")
         self.navigation_frame.results_button.configure(fg_color="#4CAF50")
 
     def display_error(self, message):
         # Show an error message dialog
         messagebox.showerror("Error", message)
-        print(f"Error: {message}")
+        logger.error(message)
 
     def start(self):
         self.mainloop()
\ No newline at end of file
@@ -1,21 +1,47 @@
+import threading
 import customtkinter as ctk
-import matplotlib.pyplot as plt
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
 import numpy as np
 from utils.parameters import plot_options
+from utils.instrumentation import instrumentation
 from .base import BaseView
-
-plt.rcParams['font.family'] = 'sans-serif'
-plt.rcParams['font.sans-serif'] = ['Arial']
+from .solutions import SolutionsList
+
+# matplotlib is the slowest import of the application and the input screen doesn't use it, so it is imported on first use
+plotting_classes = None
+plotting_lock = threading.Lock()
+
+def load_plotting():
+    """Return (Figure, FigureCanvasTkAgg), importing matplotlib the first time."""
+    global plotting_classes
+    with plotting_lock:
+        if plotting_classes is None:
+            import matplotlib
+            from matplotlib.figure import Figure
+            from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+
+            matplotlib.rcParams['font.family'] = 'sans-serif'
+            matplotlib.rcParams['font.sans-serif'] = ['Arial']
+            plotting_classes = (Figure, FigureCanvasTkAgg)
+    return plotting_classes
+
+def preload_plotting():
+    # Imported in the background while the input screen is in use, by the time the results are shown it is usually done
+    threading.Thread(target=load_plotting, name="ecf-preload", daemon=True).start()
 
 class ResultsView(BaseView):
     DEFAULT_BG = "#f0f0f0"  # Default background color
     ACTIVE_BG = "#d0e0f0"  # Active background color when clicked
+    DEFAULT_PLOT_WIDTH = 1000  # Used for decimation until the plot exists
+    # Color and legend label of the function series for every plot_y_index
+    FUNCTION_STYLES = {
+        0: ('red', 'Target variable'),
+        1: ('black', 'Residual Error'),
+        2: ('magenta', 'Residual Error %'),
+    }
     
     def __init__(self, parent):
         super().__init__(parent)
 
-        self.best_functions = []
         self.current_active_row = None
 
         self.initialize_ui()
@@ -47,12 +73,10 @@ class ResultsView(BaseView):
             ctk.CTkLabel(self.header_frame, text=header).grid(row=0, column=i)
             self.header_frame.columnconfigure(i, weight=[1, 2, 8][i], uniform="Silent_Creme")
 
-        # Setup scrollable list frame for displaying solutions
-        self.solutions_list_frame = ctk.CTkScrollableFrame(self.solutions_master_frame, width=300, height=200, scrollbar_fg_color="#008000", fg_color="#f0f0f0")
+        # Setup virtualized list frame for displaying solutions, only the visible rows have widgets
+        self.solutions_list_frame = SolutionsList(self.solutions_master_frame, width=300, height=200)
         self.solutions_list_frame.grid(row=1, column=0, sticky="nsew")
-        self.solutions_list_frame.grid_columnconfigure(0, weight=1, uniform="Silent_Creme")
-        self.solutions_list_frame.grid_columnconfigure(1, weight=2, uniform="Silent_Creme")
-        self.solutions_list_frame.grid_columnconfigure(2, weight=8, uniform="Silent_Creme")
+        self.solutions_list_frame.register_callback('select_row', lambda row: self.invoke_callback('select_row', row))
         self.solutions_master_frame.grid_rowconfigure(1, weight=1)  # Allocate most space to the list frame
         self.solutions_master_frame.grid_columnconfigure(0, weight=1)  # Allocate most space to the list frame
 
@@ -95,14 +119,41 @@ class ResultsView(BaseView):
             self.setup_dropdown(frame, variable_name, label, choices, idx+start_row, 1)
 
     def setup_plot_area(self):
-        """Setup the plotting area."""
-        self.figure = plt.Figure(figsize=(3, 3))
-        self.ax = self.figure.add_subplot(111)
-        self.canvas = FigureCanvasTkAgg(self.figure, self)
-        self.canvas.draw()
-        self.canvas_widget = self.canvas.get_tk_widget()
-        self.canvas_widget.grid(row=3, column=3, columnspan=3, rowspan=3, sticky='nsew')
+        """Setup the plotting area, the figure itself is created by create_plot once the results are shown."""
+        self.figure = None
+        self.ax = None
+        self.canvas = None
+        # Arguments of the latest update_plot call made before the plot existed
+        self.pending_plot = None
+
+    def create_plot(self):
+        if self.canvas is not None:
+            return
+        with instrumentation.span('plot.create'):
+            Figure, FigureCanvasTkAgg = load_plotting()
+            self.figure = Figure(figsize=(3, 3))
+            self.ax = self.figure.add_subplot(111)
+            self.setup_plot_artists()
+            self.canvas = FigureCanvasTkAgg(self.figure, self)
+            # The background is saved after every full draw, so the function series can be redrawn on its own
+            self.canvas.mpl_connect('draw_event', self.handle_draw_event)
+            self.canvas.draw()
+            self.canvas_widget = self.canvas.get_tk_widget()
+            self.canvas_widget.grid(row=3, column=3, columnspan=3, rowspan=3, sticky='nsew')
+
+        if self.pending_plot is not None:
+            pending_plot, self.pending_plot = self.pending_plot, None
+            self.update_plot(*pending_plot)
     
+    def setup_plot_artists(self):
+        # Artists are created once and updated in place, function series are animated so full draws leave them out of the background
+        self.data_artist = self.ax.scatter([], [], color='blue', label='Data', visible=False)
+        self.function_scatter = self.ax.scatter([], [], animated=True, visible=False)
+        self.function_line, = self.ax.plot([], [], animated=True, visible=False)
+        self.background = None
+        self.plot_layout = None
+        self.data_series = None
+
     def setup_keyboard_bindings(self):
         # Ensure the frame can receive focus
         self.solutions_list_frame.focus_set()
@@ -112,16 +163,18 @@ class ResultsView(BaseView):
 
     def reset_row_colors(self):
         # Reset colors for all rows to default
-        for widget in self.solutions_list_frame.winfo_children():
-            if isinstance(widget, ctk.CTkLabel):
-                widget.configure(fg_color=self.DEFAULT_BG)
+        self.solutions_list_frame.set_active_row(None)
 
     def set_active_row_color(self, row):
         # Set the active row color
-        for index, widget in enumerate(self.solutions_list_frame.winfo_children()):
-            if index // 3 == row:  # Assuming 3 widgets per row
-                widget.configure(fg_color=self.ACTIVE_BG)
-                self.current_active_row = row
+        self.solutions_list_frame.set_active_row(row)
+        self.current_active_row = row
+
+    def get_row_count(self):
+        return self.solutions_list_frame.get_row_count()
+
+    def get_solution(self, row):
+        return self.solutions_list_frame.functions[row]
     
     def update_info(self, function, error):
         # Enable the textbox to modify its contents
@@ -132,93 +185,111 @@ class ResultsView(BaseView):
         # Update other information variables
         self.info_vars["Error"].set(f"{float(error):.6f}")
 
-    def update_plot(self, x_data, y_data, x_values=None, function_results=None, multivar=False, plot_type="scatter", plot_scale=0, plot_y_index=0):
-        self.ax.clear()  # Clear the previous plot
-        
-        x_data = np.array(x_data)
-        y_data = np.array(y_data)
-
-        if plot_y_index == 0:
-            self.ax.scatter(x_data, y_data, color='blue', label='Data')  # Scatter plot of original data
-
-        if function_results is not None:
-            function_results = np.array(function_results)
-            residuals = np.subtract(y_data, function_results)
-
-            if plot_y_index == 1:
-                self.add_to_plot(x_data, residuals, 'black', 'Residual Error', plot_type)
-                #self.ax.plot(x_data, residuals, 'r-', label='Residual Error')
-            elif plot_y_index == 2:
-                with np.errstate(divide='ignore', invalid='ignore'):
-                    residual_percent = np.abs(residuals / y_data) * 100
-                    valid_mask = np.isfinite(residual_percent)
-                    print(f"valid_mask: {valid_mask}")
-                    print(f"Residual percent: {residual_percent}")
-                    self.add_to_plot(x_data[valid_mask], residual_percent[valid_mask], 'magenta', 'Residual Error %', plot_type)
-                    #self.ax.plot(x_data[valid_mask], residual_percent[valid_mask], 'm-', label='Residual Error %')
-            else:
-                self.add_to_plot(x_data, function_results, 'red', 'Target variable', plot_type)
-                #self.ax.plot(x_data, function_results, color='red', label='Function')  # Scatter plot of function evaluation
-
-        if plot_scale == 1:  # Log scale for y-axis
-            self.ax.set_yscale('log')
-        elif plot_scale == 2:  # Log scale for x-axis
-            self.ax.set_xscale('log')
-        elif plot_scale == 3:  # Log scale for both axes
-            self.ax.set_yscale('log')
-            self.ax.set_xscale('log')
-
-        self.ax.legend()  # Add a legend to distinguish plotted lines
+    def get_plot_width(self):
+        # Width of the axes in pixels, which is how many columns a decimated line plot needs
+        if self.ax is None:
+            return self.DEFAULT_PLOT_WIDTH
+        return max(int(self.ax.bbox.width), 1)
+
+    def update_plot(self, data_series=None, function_series=None, plot_type="scatter", plot_scale=0, plot_y_index=0):
+        if self.canvas is None:
+            self.pending_plot = (data_series, function_series, plot_type, plot_scale, plot_y_index)
+            return
+        with instrumentation.span('plot.draw'):
+            self.draw_plot(data_series, function_series, plot_type, plot_scale, plot_y_index)
+
+    def draw_plot(self, data_series, function_series, plot_type, plot_scale, plot_y_index):
+        function_artist = self.function_line if plot_type == "plot" else self.function_scatter
+        color, label = self.FUNCTION_STYLES.get(plot_y_index, self.FUNCTION_STYLES[0])
+
+        self.set_series(self.data_artist, data_series)
+        self.set_series(self.function_scatter, function_series if function_artist is self.function_scatter else None)
+        self.set_series(self.function_line, function_series if function_artist is self.function_line else None)
+        # The legend only lists visible artists, so showing or hiding the function also needs a full draw
+        layout = (plot_type, plot_scale, plot_y_index, data_series is not None, function_artist.get_visible(), label)
+
+        # When only the function series changed and it still fits the axes, it is drawn over the saved background
+        if layout == self.plot_layout and data_series is self.data_series and self.background is not None and self.fits_axes(function_series):
+            self.canvas.restore_region(self.background)
+            if function_artist.get_visible():
+                self.ax.draw_artist(function_artist)
+            self.canvas.blit(self.ax.bbox)
+            instrumentation.count('plot.blits')
+            return
+
+        self.plot_layout = layout
+        self.data_series = data_series
+
+        function_artist.set_color(color)
+        function_artist.set_label(label)
+
+        self.ax.set_xscale('log' if plot_scale in (2, 3) else 'linear')
+        self.ax.set_yscale('log' if plot_scale in (1, 3) else 'linear')
+        self.update_limits(data_series, function_series)
+        self.update_legend()
         self.canvas.draw()  # Update the canvas
 
-    def add_to_plot(self, x, y, color, label, type):
-        if type == "plot":
-            self.ax.plot(x, y, color=color, label=label)
-        elif type == "bar":
-            self.ax.bar(x, y, color=color, label=label)
+    def set_series(self, artist, series):
+        if series is None or len(series[0]) == 0:
+            artist.set_visible(False)
+            return
+        if artist is self.function_line:
+            artist.set_data(*series)
         else:
-            self.ax.scatter(x, y, color=color, label=label)
+            artist.set_offsets(np.column_stack(series))
+        artist.set_visible(True)
+
+    def update_limits(self, *all_series):
+        # Persistent artists are not rescaled on their own, so the data limits are rebuilt from the visible series
+        self.ax.ignore_existing_data_limits = True
+        for series in all_series:
+            if series is None or len(series[0]) == 0:
+                continue
+            points = np.column_stack(series)
+            points = points[np.isfinite(points).all(axis=1)]
+            if len(points) > 0:
+                self.ax.update_datalim(points)
+        self.ax.autoscale_view()
+
+    def fits_axes(self, series):
+        if series is None or len(series[0]) == 0:
+            return True
+        for values, limits in zip(series, (self.ax.get_xlim(), self.ax.get_ylim())):
+            values = np.asarray(values)
+            values = values[np.isfinite(values)]
+            if len(values) > 0 and (values.min() < min(limits) or values.max() > max(limits)):
+                return False
+        return True
+
+    def update_legend(self):
+        handles = [artist for artist in (self.data_artist, self.function_scatter, self.function_line) if artist.get_visible()]
+        if handles:
+            self.ax.legend(handles=handles)  # Add a legend to distinguish plotted series
+        elif self.ax.get_legend() is not None:
+            self.ax.get_legend().remove()
+
+    def handle_draw_event(self, event):
+        # Animated artists are skipped by full draws, they are drawn over the newly saved background instead
+        self.background = self.canvas.copy_from_bbox(self.ax.bbox)
+        for artist in (self.function_scatter, self.function_line):
+            if artist.get_visible():
+                self.ax.draw_artist(artist)
 
     def create_solution_row(self, func, row_index):
-        size_label = ctk.CTkLabel(self.solutions_list_frame, text=str(func["size"]), justify="center")
-        size_label.grid(row=row_index, column=0, sticky='ew')
-
-        error_label = ctk.CTkLabel(self.solutions_list_frame, text=f'{func["error"]:.4f}', justify="center")
-        error_label.grid(row=row_index, column=1, sticky='ew')
+        self.solutions_list_frame.set_row(row_index, func)
 
-        function_text = func["function"] if len(func["function"]) <= 70 else func["function"][:67] + "..."
-        function_label = ctk.CTkLabel(self.solutions_list_frame, text=function_text, justify="left")
-        function_label.grid(row=row_index, column=2, sticky='ew')
+    def update_solution_row(self, func, row_index):
+        self.solutions_list_frame.set_row(row_index, func)
 
-        # Bind the click event to the entire row
-        for label in [size_label, error_label, function_label]:
-            label.bind("<Button-1>", lambda event, row=row_index: self.invoke_callback('select_row', row))
+    def insert_solution_row(self, func, row_index):
+        self.solutions_list_frame.insert_row(row_index, func)
 
-    def update_solution_row(self, func, row_index):
-        # Iterate over all children widgets in the solutions list frame
-        for widget in self.solutions_list_frame.winfo_children():
-            # Grid_info returns dictionary with details about the grid configuration of the widget
-            info = widget.grid_info()
-            # Check if the widget is in the row we want to destroy
-            if info['row'] == row_index:
-                if info['column'] == 0:
-                    widget.configure(text=str(func["size"]))
-                if info['column'] == 1:
-                    widget.configure(text=f'{func["error"]:.4f}')
-                if info['column'] == 2:
-                    function_text = func["function"] if len(func["function"]) <= 70 else func["function"][:67] + "..."
-                    widget.configure(text=function_text)
-                widget.unbind("<Button-1>")
-                widget.bind("<Button-1>", lambda event, row=row_index: self.invoke_callback('select_row', row))
-    
     def destroy_solution_row(self, row_index):
-        # Iterate over all children widgets in the solutions list frame
-        for widget in self.solutions_list_frame.winfo_children():
-            # Grid_info returns dictionary with details about the grid configuration of the widget
-            info = widget.grid_info()
-            # Check if the widget is in the row we want to destroy
-            if info['row'] == row_index and widget.winfo_exists():
-                widget.destroy()
+        self.solutions_list_frame.remove_row(row_index)
+
+    def clear_solution_rows(self):
+        self.solutions_list_frame.clear()
+        self.current_active_row = None
 
     def clear_function_display(self):
         self.function_display.configure(state='normal')
@@ -227,22 +298,21 @@ class ResultsView(BaseView):
 
     def clear_frame(self):
         # Clear the solutions frame
-        for widget in self.solutions_list_frame.winfo_children():
-            widget.destroy()
+        self.clear_solution_rows()
 
         # Reset all information variables to default values
         for key in self.info_vars:
             self.info_vars[key].set("0")
 
-        # Clear the plot
-        self.ax.clear()
-        
-        # Check if there are any artists with labels in the plot
-        if self.ax.get_legend_handles_labels()[0]:
-            self.ax.legend().remove()  # Remove the legend if it exists
-
-        self.canvas.draw()
+        # Clear the plot, the artists are hidden and reused by the next update
+        self.pending_plot = None
+        if self.canvas is not None:
+            for artist in (self.data_artist, self.function_scatter, self.function_line):
+                artist.set_visible(False)
+            self.plot_layout = None
+            self.data_series = None
+            self.update_legend()
+            self.canvas.draw()
         self.reset_row_colors() 
 
-        self.best_functions = []
         self.current_active_row = None
\ No newline at end of file
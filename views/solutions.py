@@ -0,0 +1,177 @@
+import customtkinter as ctk
+from utils.publisher import Publisher
+
+class SolutionsList(ctk.CTkFrame, Publisher):
+    """Virtualized list of solutions which only has widgets for the visible rows and reuses them while scrolling."""
+    DEFAULT_BG = "#f0f0f0"  # Default background color
+    ACTIVE_BG = "#d0e0f0"  # Active background color when clicked
+    ROW_HEIGHT = 28
+    MAX_FUNCTION_LENGTH = 70
+
+    def __init__(self, parent, **kwargs):
+        ctk.CTkFrame.__init__(self, parent, fg_color=self.DEFAULT_BG, **kwargs)
+        Publisher.__init__(self)
+
+        self.functions = []
+        self.first_row = 0
+        self.active_row = None
+        # Widgets of the visible rows, slot i shows row first_row + i
+        self.slots = []
+
+        self.rows_frame = ctk.CTkFrame(self, fg_color=self.DEFAULT_BG)
+        self.rows_frame.grid(row=0, column=0, sticky="nsew")
+        for column, weight in enumerate([1, 2, 8]):
+            self.rows_frame.grid_columnconfigure(column, weight=weight, uniform="Silent_Creme")
+
+        self.scrollbar = ctk.CTkScrollbar(self, command=self.handle_scrollbar, button_color="#008000")
+        self.scrollbar.grid(row=0, column=1, sticky="ns")
+        self.grid_rowconfigure(0, weight=1)
+        self.grid_columnconfigure(0, weight=1)
+
+        self.rows_frame.bind("<Configure>", self.handle_resize)
+        self.bind_scrolling(self.rows_frame)
+
+    def bind_scrolling(self, widget):
+        widget.bind("<MouseWheel>", lambda event: self.scroll(-1 if event.delta > 0 else 1))
+        # X11 reports the mouse wheel as buttons 4 and 5
+        widget.bind("<Button-4>", lambda event: self.scroll(-1))
+        widget.bind("<Button-5>", lambda event: self.scroll(1))
+
+    def handle_resize(self, event):
+        visible_rows = max(event.height // self.ROW_HEIGHT, 1)
+        while len(self.slots) < visible_rows:
+            self.create_slot(len(self.slots))
+        # Slots below the frame after it shrinks would still be filled and redrawn, so they are dropped
+        while len(self.slots) > visible_rows:
+            for label in self.slots.pop():
+                label.destroy()
+        self.scroll_to(self.first_row)
+
+    def create_slot(self, slot):
+        labels = [
+            ctk.CTkLabel(self.rows_frame, height=self.ROW_HEIGHT, justify=justify, anchor=anchor, fg_color=self.DEFAULT_BG)
+            for justify, anchor in [("center", "center"), ("center", "center"), ("left", "w")]
+        ]
+        for column, label in enumerate(labels):
+            label.grid(row=slot, column=column, sticky='ew')
+            label.grid_remove()
+            # Clicks are resolved to a row when they happen, so recycled widgets never need rebinding
+            label.bind("<Button-1>", lambda event, slot=slot: self.handle_click(slot))
+            self.bind_scrolling(label)
+        self.slots.append(labels)
+
+    def get_visible_rows(self):
+        return max(self.rows_frame.winfo_height() // self.ROW_HEIGHT, 1)
+
+    def get_row_count(self):
+        return len(self.functions)
+
+    def get_slot(self, row):
+        # Index of the widgets showing a row, or None when the row isn't visible
+        slot = row - self.first_row
+        if 0 <= slot < len(self.slots):
+            return slot
+        return None
+
+    def handle_click(self, slot):
+        row = self.first_row + slot
+        if row < len(self.functions):
+            self.invoke_callback('select_row', row)
+
+    def handle_scrollbar(self, *args):
+        if args[0] == 'moveto':
+            self.scroll_to(round(float(args[1]) * len(self.functions)))
+        elif args[0] == 'scroll':
+            step = self.get_visible_rows() if args[2] == 'pages' else 1
+            self.scroll(step if float(args[1]) > 0 else -step)
+
+    def scroll(self, rows):
+        self.scroll_to(self.first_row + rows)
+
+    def scroll_to(self, first_row):
+        visible_rows = self.get_visible_rows()
+        self.first_row = max(0, min(first_row, len(self.functions) - visible_rows))
+        for slot in range(len(self.slots)):
+            self.draw_row(self.first_row + slot)
+        self.update_scrollbar()
+
+    def see(self, row):
+        visible_rows = self.get_visible_rows()
+        if row < self.first_row:
+            self.scroll_to(row)
+        elif row >= self.first_row + visible_rows:
+            self.scroll_to(row - visible_rows + 1)
+
+    def update_scrollbar(self):
+        if not self.functions:
+            self.scrollbar.set(0, 1)
+            return
+        total = len(self.functions)
+        self.scrollbar.set(self.first_row / total, min((self.first_row + self.get_visible_rows()) / total, 1))
+
+    def draw_row(self, row):
+        slot = self.get_slot(row)
+        if slot is None:
+            return
+        labels = self.slots[slot]
+        if row >= len(self.functions):
+            for label in labels:
+                label.grid_remove()
+            return
+
+        func = self.functions[row]
+        function_text = func["function"] if len(func["function"]) <= self.MAX_FUNCTION_LENGTH else func["function"][:self.MAX_FUNCTION_LENGTH - 3] + "..."
+        color = self.ACTIVE_BG if row == self.active_row else self.DEFAULT_BG
+        for label, text in zip(labels, [str(func["size"]), f'{func["error"]:.4f}', function_text]):
+            label.configure(text=text, fg_color=color)
+            label.grid()
+
+    def set_row(self, row, func):
+        """Show func in a row, a row just past the end is appended."""
+        if row < len(self.functions):
+            self.functions[row] = func
+            self.draw_row(row)
+        else:
+            self.functions.append(func)
+            self.draw_row(len(self.functions) - 1)
+            self.update_scrollbar()
+
+    def insert_row(self, row, func):
+        self.functions.insert(row, func)
+        if self.active_row is not None and self.active_row >= row:
+            self.active_row += 1
+        self.redraw_from(row)
+
+    def remove_row(self, row):
+        if row >= len(self.functions):
+            return
+        del self.functions[row]
+        if self.active_row is not None:
+            if self.active_row == row:
+                self.active_row = None
+            elif self.active_row > row:
+                self.active_row -= 1
+        self.redraw_from(row)
+
+    def redraw_from(self, row):
+        # Rows above the change keep their widgets as they are
+        if row < self.first_row or self.first_row > max(len(self.functions) - self.get_visible_rows(), 0):
+            self.scroll_to(self.first_row)
+            return
+        for slot in range(row - self.first_row, len(self.slots)):
+            self.draw_row(self.first_row + slot)
+        self.update_scrollbar()
+
+    def set_active_row(self, row):
+        previous_row = self.active_row
+        self.active_row = row
+        if previous_row is not None:
+            self.draw_row(previous_row)
+        if row is not None:
+            self.see(row)
+            self.draw_row(row)
+
+    def clear(self):
+        self.functions = []
+        self.active_row = None
+        self.scroll_to(0)